@@ -2,6 +2,8 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from routes import register_blueprints
 from config import get_config
+from database import get_pool_stats
+from utils.cache_utils import get_cache_stats
 import os
 
 def create_app():
@@ -15,6 +17,15 @@ def create_app():
     @app.route("/")
     def home():
         return jsonify({"welcome": "Welcome to the Suggestify API!"})
+
+    @app.route("/health")
+    def health():
+        """ Report this worker's connection pool and cache counters for monitoring """
+        return jsonify({
+            "status": "ok",
+            "database_pool": get_pool_stats(),
+            "cache": get_cache_stats()
+        })
     
     return app
 
@@ -16,13 +16,78 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
     TMDB_API_KEY = os.getenv('TMBD_API_KEY')
     JWT_EXPIRATION_HOURS = 24
-    
+
+    # TMDB client configuration
+    TMDB_BASE_URL = os.getenv('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
+    TMDB_POOL_SIZE = int(os.getenv('TMDB_POOL_SIZE', 20))
+    TMDB_TIMEOUT = float(os.getenv('TMDB_TIMEOUT', 10))
+    TMDB_MAX_RETRIES = int(os.getenv('TMDB_MAX_RETRIES', 3))
+    TMDB_BACKOFF_FACTOR = float(os.getenv('TMDB_BACKOFF_FACTOR', 0.5))
+
     # Database configuration
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_PORT = int(os.getenv('DB_PORT', 3306))
     DB_USER = os.getenv('DB_USER', 'root')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
     DB_NAME = os.getenv('DB_NAME', '')
+
+    # Database connection pool (per worker): max connections, seconds to wait for a free one,
+    # and seconds a connection may sit idle before it is pinged on checkout
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_PING_INTERVAL = int(os.getenv('DB_POOL_PING_INTERVAL', 30))
+    # Extra connections allowed for threads that already hold one when the pool is full
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 5))
+
+    # Local movie catalog configuration (hours before a stored movie is refreshed from TMDB)
+    MOVIE_CATALOG_TTL_HOURS = int(os.getenv('MOVIE_CATALOG_TTL_HOURS', 168))
+    # Seconds a favourite title's resolved TMDB id is cached (kept across restarts by the sqlite and redis backends)
+    TITLE_ID_CACHE_TTL = int(os.getenv('TITLE_ID_CACHE_TTL', 30 * 24 * 3600))
+
+    # Offline TF-IDF model built with `python -m utils.tfidf_model` (newest versions kept on disk)
+    TFIDF_MODEL_DIR = os.getenv('TFIDF_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tfidf_models'))
+    TFIDF_MODEL_KEEP_VERSIONS = int(os.getenv('TFIDF_MODEL_KEEP_VERSIONS', 3))
+
+    # Candidate retrieval: LSH tables and bits per table built with the TF-IDF model (more bits means smaller
+    # buckets and faster lookups, more tables means better recall, at most 32 bits), and how many similar catalog movies
+    # are added to the TMDB list candidates (0 disables it)
+    LSH_TABLES = int(os.getenv('LSH_TABLES', 16))
+    LSH_BITS = int(os.getenv('LSH_BITS', 10))
+    RETRIEVAL_CANDIDATES = int(os.getenv('RETRIEVAL_CANDIDATES', 100))
+
+    # Recommendation diversity: genre_cap or mmr, and MMR's relevance/novelty trade-off (1.0 is pure relevance)
+    DIVERSITY_STRATEGY = os.getenv('DIVERSITY_STRATEGY', 'genre_cap')
+    MMR_LAMBDA = float(os.getenv('MMR_LAMBDA', 0.7))
+    # Extra top-scored movies, beyond the ones returned, kept for the diversity filter to choose from
+    DIVERSITY_BUFFER = int(os.getenv('DIVERSITY_BUFFER', 180))
+
+    # Watchlist pagination (page size when a cursor is given without a limit, and the largest limit allowed)
+    WATCHLIST_PAGE_SIZE = int(os.getenv('WATCHLIST_PAGE_SIZE', 50))
+    WATCHLIST_MAX_PAGE_SIZE = int(os.getenv('WATCHLIST_MAX_PAGE_SIZE', 200))
+
+    # Cache configuration (memory is per worker, sqlite and redis are shared by all workers on a host)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    # Kept in a directory the app owns, the cache is unpickled so no other user may be able to write it
+    CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'suggestify_cache.sqlite3'))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_SWEEP_INTERVAL = int(os.getenv('CACHE_SWEEP_INTERVAL', 60))
+    # Stampede protection: seconds an expired value may still be served while one caller recomputes it,
+    # how long a recompute lease is held, and the last fraction of a TTL in which hot keys are refreshed early
+    CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', 600))
+    CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', 120))
+    CACHE_REFRESH_AHEAD_RATIO = float(os.getenv('CACHE_REFRESH_AHEAD_RATIO', 0.1))
+    # Seconds a user's serialized recommendations are cached, kept short with the memory backend
+    # because clearing it after a save only reaches the worker that saved
+    STORED_RECOMMENDATIONS_TTL = int(os.getenv('STORED_RECOMMENDATIONS_TTL', 86400))
+    STORED_RECOMMENDATIONS_LOCAL_TTL = int(os.getenv('STORED_RECOMMENDATIONS_LOCAL_TTL', 60))
+
+    # Background jobs: worker threads per process, how long finished job statuses are kept,
+    # and how long to wait before retrying a failed recommendation refresh
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 3600))
+    JOB_RETRY_SECONDS = int(os.getenv('JOB_RETRY_SECONDS', 300))
     
     # Environment detection
     IS_PRODUCTION = is_production()
@@ -1,13 +1,228 @@
+import time
+import queue
+import threading
 import mysql.connector
+from mysql.connector.errors import PoolError
 from config import get_config
 
+class PooledConnection:
+    """ Connection borrowed from the pool, close() hands it back instead of disconnecting """
+
+    def __init__(self, pool, connection, held, overflow=False):
+        self._pool = pool
+        self._connection = connection
+        # Borrow count of the thread that checked this out, it may be closed from another thread
+        self._held = held
+        self._overflow = overflow
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise mysql.connector.errors.OperationalError("Connection has been returned to the pool")
+        return getattr(self._connection, name)
+
+    def close(self):
+        """ Return the connection to the pool """
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection, self._held, self._overflow)
+
+    def __del__(self):
+        # Safety net for callers that forget to close, so the pool slot isn't lost for good
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class HeldCount:
+    """ How many connections one thread currently has borrowed """
+
+    def __init__(self):
+        self.count = 0
+
+class ConnectionPool:
+    """ Bounded pool of MySQL connections with health checks and checkout metrics """
+
+    def __init__(self, size=10, timeout=10, ping_interval=30, max_overflow=5):
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.max_overflow = max_overflow
+
+        # Idle connections as (last_used, connection), most recently used first
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        # Extra connections for threads that already hold one when the pool is full
+        self._overflow_slots = threading.BoundedSemaphore(max_overflow) if max_overflow > 0 else None
+        self._lock = threading.Lock()
+        # How many connections each thread currently has borrowed
+        self._held = threading.local()
+
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.overflows = 0
+        self.overflow_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _open(self):
+        config = get_config()
+        connection = mysql.connector.connect(
+            host = config.DB_HOST,
+            port = config.DB_PORT,
+            user = config.DB_USER,
+            password = config.DB_PASSWORD,
+            database = config.DB_NAME
+        )
+        with self._lock:
+            self.created += 1
+        return connection
+
+    def _discard(self, connection):
+        with self._lock:
+            self.discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _take_idle(self):
+        """ Get a healthy idle connection, or None if there isn't one """
+        while True:
+            try:
+                last_used, connection = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+
+            # Only ping connections that have sat idle long enough for the server to drop them
+            if time.monotonic() - last_used < self.ping_interval:
+                return connection
+            try:
+                connection.ping(reconnect=False)
+                return connection
+            except Exception as e:
+                print(f"Dropping dead pooled connection: {e}")
+                self._discard(connection)
+
+    def _held_count(self):
+        """ Get the calling thread's borrow count """
+        held = getattr(self._held, "counter", None)
+        if held is None:
+            held = self._held.counter = HeldCount()
+        return held
+
+    def _acquire_slot(self, held):
+        """ Wait for a pool slot, returning True if an overflow slot was taken instead """
+        if held.count:
+            # A thread that already holds a connection doesn't wait for another one while overflow
+            # slots are free, otherwise nested lookups (e.g. a profile build reading the catalog)
+            # could deadlock a full pool
+            if self._slots.acquire(blocking=False):
+                return False
+            if self._overflow_slots is not None and self._overflow_slots.acquire(blocking=False):
+                return True
+
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolError(f"No database connection available after {self.timeout} seconds")
+        return False
+
+    def get_connection(self):
+        """ Borrow a connection, waiting up to timeout seconds if the pool is exhausted """
+        start = time.monotonic()
+        held = self._held_count()
+        overflow = self._acquire_slot(held)
+        waited = time.monotonic() - start
+
+        try:
+            # Overflow connections are never kept, so they don't come from the idle queue either
+            connection = self._open() if overflow else (self._take_idle() or self._open())
+        except Exception:
+            (self._overflow_slots if overflow else self._slots).release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if overflow:
+                self.overflows += 1
+                self.overflow_in_use += 1
+            held.count += 1
+
+        return PooledConnection(self, connection, held, overflow=overflow)
+
+    def release(self, connection, held, overflow=False):
+        """ Put a connection back in the pool, ending any transaction the borrower left open """
+        with self._lock:
+            held.count = max(held.count - 1, 0)
+
+        if overflow:
+            try:
+                connection.close()
+            except Exception as e:
+                print(f"Error closing overflow connection: {e}")
+            finally:
+                with self._lock:
+                    self.in_use -= 1
+                    self.overflow_in_use -= 1
+                self._overflow_slots.release()
+            return
+
+        try:
+            connection.rollback()
+            self._idle.put((time.monotonic(), connection))
+        except Exception as e:
+            print(f"Discarding pooled connection that could not be reset: {e}")
+            self._discard(connection)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        """ Get pool size and checkout wait counters for monitoring """
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "max_overflow": self.max_overflow,
+                "overflows": self.overflows,
+                "overflow_in_use": self.overflow_in_use,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 2)
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """ Get this worker's connection pool, creating it on first use """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = get_config()
+                _pool = ConnectionPool(
+                    size=config.DB_POOL_SIZE,
+                    timeout=config.DB_POOL_TIMEOUT,
+                    ping_interval=config.DB_POOL_PING_INTERVAL,
+                    max_overflow=config.DB_POOL_MAX_OVERFLOW
+                )
+    return _pool
+
 def get_db_connection():
-    config = get_config()
-    connection = mysql.connector.connect(
-        host = config.DB_HOST,
-        port = config.DB_PORT,
-        user = config.DB_USER,
-        password = config.DB_PASSWORD,
-        database = config.DB_NAME
-    )
-    return connection
\ No newline at end of file
+    return get_pool().get_connection()
+
+def get_pool_stats():
+    """ Get connection pool counters for monitoring """
+    return get_pool().stats()
@@ -7,6 +7,7 @@ from utils.movie_utils import (
     build_enhanced_movie_profile, 
     parse_list_from_db,
     fetch_movie,
+    fetch_movie_bundles,
     identify_themes,
     identify_tone,
     identify_target_audience,
@@ -119,6 +120,13 @@ class UserPreferenceModel:
         actor_scores = {}
         
         current_time = datetime.now()
+
+        # Load every watchlist movie up front (one catalog query, TMDB only for misses)
+        try:
+            movie_bundles = fetch_movie_bundles([item.get('movie_id') for item in watchlist_items])
+        except Exception as e:
+            print(f"Error prefetching watchlist movies: {e}")
+            movie_bundles = {}
         
         for item in watchlist_items:
             movie_id = item.get('movie_id')
@@ -173,8 +181,8 @@ class UserPreferenceModel:
             
             # Extract and track preferences by category
             try:
-                # For each movie in watchlist, fetch its details from TMDB
-                movie_details = fetch_movie(movie_id)
+                # For each movie in watchlist, use the prefetched details
+                movie_details = movie_bundles.get(int(movie_id)) or fetch_movie(movie_id)
                 
                 if movie_details:
                     # Extract and process genres
@@ -457,11 +465,17 @@ class UserPreferenceModel:
         franchise_counter = Counter()
         tone_counter = Counter()
         
+        try:
+            movie_bundles = fetch_movie_bundles(movie_ids)
+        except Exception as e:
+            print(f"Error prefetching successful recommendations: {e}")
+            movie_bundles = {}
+
         count = 0
         for movie_id in movie_ids:
             try:
-                # Fetch movie details from TMDB API
-                movie_details = fetch_movie(movie_id)
+                # Use the catalog details, falling back to a single fetch
+                movie_details = movie_bundles.get(int(movie_id)) or fetch_movie(movie_id)
                 if not movie_details:
                     continue
                 
@@ -1,9 +1,21 @@
 from flask import Blueprint, jsonify, request
 from database import get_db_connection
 from utils.auth_utils import token_required
+from utils.movie_utils import encode_list_for_db
+from utils.candidate_service import invalidate_candidate_movies
+from utils.movie_title_index import index_favourite_titles
+from utils.job_queue import job_queue
+from routes.recommendations import invalidate_stored_recommendations
 
 preferences_bp = Blueprint('preferences', __name__)
 
+def queue_favourite_title_index(user_id, favourite_movies):
+    """ Resolve the favourite titles to TMDB ids in the background so recommendation runs don't search for them """
+    try:
+        job_queue.submit("title_index", f"title_index:{user_id}:{favourite_movies}", index_favourite_titles, favourite_movies, owner=user_id)
+    except Exception as e:
+        print(f"Error queueing favourite title index: {e}")
+
 @preferences_bp.route("/save_questionnaire", methods=["POST"])
 @token_required
 def save_questionnaire(current_user):
@@ -48,10 +60,13 @@ def save_questionnaire(current_user):
                     watch_frequency = %s, favourite_actors = %s, last_updated = NOW() 
                 WHERE user_id = %s
             """, (
-                str(favourite_movies), str(genres), age, gender, 
-                watch_frequency, str(favourite_actors), user_id
+                encode_list_for_db(favourite_movies), encode_list_for_db(genres), age, gender, 
+                watch_frequency, encode_list_for_db(favourite_actors), user_id
             ))
             connection.commit()
+            # Candidates are built from the questionnaire, so drop the ones built from the old answers
+            invalidate_candidate_movies(email)
+            queue_favourite_title_index(user_id, favourite_movies)
             return jsonify({"success": "We have updated your preferences"}), 200
         else:
             # Add new preferences
@@ -60,10 +75,12 @@ def save_questionnaire(current_user):
                 (user_id, favourite_movies, genres, age, gender, watch_frequency, favourite_actors, last_updated) 
                 VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
             """, (
-                user_id, str(favourite_movies), str(genres), age, 
-                gender, watch_frequency, str(favourite_actors)
+                user_id, encode_list_for_db(favourite_movies), encode_list_for_db(genres), age, 
+                gender, watch_frequency, encode_list_for_db(favourite_actors)
             ))
             connection.commit()
+            invalidate_candidate_movies(email)
+            queue_favourite_title_index(user_id, favourite_movies)
             return jsonify({"success": "Data was saved successfully"}), 201
     except Exception as e:
         connection.rollback()
@@ -153,6 +170,7 @@ def refresh_recommendations(current_user):
         """, (user_id,))
         
         connection.commit()
+        invalidate_stored_recommendations(user_id)
         
         return jsonify({"success": "Recommendations will be refreshed on next request"}), 200
     except Exception as e:
@@ -1,63 +1,40 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
+from werkzeug.http import http_date
 from database import get_db_connection
 from utils.auth_utils import token_required
 from utils.movie_utils import (
     parse_list_from_db, 
+    encode_list_for_db,
     build_enhanced_movie_profile,
     fetch_movie, 
-    fetch_movie_by_title, 
+    fetch_movie_bundles,
+    fetch_catalog_candidates,
+    normalize_movie_title,
+    index_title_words,
+    matches_indexed_title,
     fetch_movies_by_genre, 
-    fetch_movies_by_keyword,
-    is_same_movie
+    fetch_movies_by_keyword
 )
+from utils.movie_title_index import get_indexed_titles, resolve_title_ids
 from routes.watchlist import get_user_watchlist_preferences
-from utils.cache_utils import cache_decorator
+from utils.candidate_service import get_candidate_movies
+from utils.cache_utils import get_or_compute_cached_data, delete_cached_data, is_shared_cache
+from utils.job_queue import job_queue
+from utils.scoring_utils import score_candidate_movies, as_feature_list
+from utils.diversity_utils import ensure_diversity, align_movie_vectors
+from utils.tfidf_model import get_tfidf_model, new_vectorizer
+from utils.tmdb_client import tmdb_client
 from models.user_preference_model import UserPreferenceModel, build_user_preference_model
-import requests
-import ast
+import copy
 import json
-import time
-from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime, timedelta
 from config import get_config
-import os
 
 recommendations_bp = Blueprint('recommendations', __name__)
 config = get_config()
-TMDB_KEY = config.TMDB_API_KEY
-
-# Used to track ongoing recommendation generations
-user_recommendation_locks = {}
-lock_mutex = Lock()
-
-# Function to check and set locks for users 
-def check_and_set_lock(user_id):
-    """Check if a user has a lock and set one if not."""
-    with lock_mutex:
-        # Check if user already has a lock
-        if user_id in user_recommendation_locks:
-            # Check if the lock is stale (older than 5 minutes)
-            current_time = time.time()
-            lock_time = user_recommendation_locks[user_id]
-            if current_time - lock_time > 300:  # 5 minutes timeout
-                print(f"Found stale lock for user {user_id}, resetting")
-                user_recommendation_locks[user_id] = current_time
-                return True
-            return False
-        else:
-            # Set a new lock with current timestamp
-            user_recommendation_locks[user_id] = time.time()
-            return True
-
-# Function to release a lock
-def release_lock(user_id):
-    """Release a user's lock."""
-    with lock_mutex:
-        if user_id in user_recommendation_locks:
-            del user_recommendation_locks[user_id]
 
 def get_user_preferences(email):
     """Get user preferences from the database."""
@@ -167,8 +144,8 @@ def should_refresh_recommendations(user_id):
         cursor.close()
         connection.close()
 
-def get_stored_recommendations(user_id):
-    """ Get stored recommendations for a user """
+def load_stored_recommendations(user_id):
+    """ Get a user's stored recommendations with their genre and actor lists decoded """
     connection = get_db_connection()
     cursor = connection.cursor(dictionary=True)
 
@@ -188,54 +165,114 @@ def get_stored_recommendations(user_id):
         """, (user_id,))
 
         recommendations = cursor.fetchall()
+        for rec in recommendations:
+            rec['genres'] = as_feature_list(parse_list_from_db(rec['genres']))
+            rec['actors'] = as_feature_list(parse_list_from_db(rec['actors']))
         return recommendations
-    except Exception as e:
-        print(f"Error fetching stored recommendations: {e}")
-        return []
     finally:
         cursor.close()
         connection.close()
 
-def get_profiles_for_favorite_movies(favorite_movies, candidate_movies=None):
+def stored_recommendations_key(user_id):
+    return f"stored_recommendations:{user_id}"
+
+def stored_recommendations_ttl():
+    """ Cache the payload for a day when every worker sees the invalidation, briefly when each has its own cache """
+    return config.STORED_RECOMMENDATIONS_TTL if is_shared_cache() else config.STORED_RECOMMENDATIONS_LOCAL_TTL
+
+def serialize_stored_recommendations(user_id):
+    """ Serialize a user's stored recommendations, None when there are none so the empty payload isn't cached """
+    recommendations = load_stored_recommendations(user_id)
+    if not recommendations:
+        return None
+    return json.dumps(recommendations, default=http_date)
+
+def get_stored_recommendations_payload(user_id):
+    """ Get stored recommendations as a serialized JSON array, cached until they are next saved """
+    try:
+        # Nothing stored yet is looked up again on every request, so each worker sees what the job saves
+        return get_or_compute_cached_data(
+            stored_recommendations_key(user_id),
+            lambda: serialize_stored_recommendations(user_id),
+            ttl=stored_recommendations_ttl()
+        ) or "[]"
+    except Exception as e:
+        print(f"Error fetching stored recommendations: {e}")
+        return "[]"
+
+def invalidate_stored_recommendations(user_id):
+    """ Drop a user's cached recommendations payload after their stored recommendations change """
+    delete_cached_data(stored_recommendations_key(user_id))
+
+def recommendations_response(payload, **fields):
+    """ JSON response with the serialized recommendations spliced in, so they are never decoded again """
+    extra = json.dumps(fields)[1:] if fields else "}"
+    separator = ", " if fields else ""
+    return Response(f'{{"recommended_movies": {payload}{separator}{extra}', mimetype="application/json")
+
+def get_profiles_for_favorite_movies(favorite_movies, candidate_movies=None, max_workers=8):
     """ Get profiles for favorite movies """
-    valid_profiles = []
-    
     print(f"DEBUG: Starting get_profiles_for_favorite_movies with {len(favorite_movies)} favorite movies")
-    
+
+    # Titles saved with the questionnaire are already in the title index, others are resolved concurrently
+    try:
+        title_ids = resolve_title_ids(favorite_movies, max_workers=max_workers)
+    except Exception as e:
+        print(f"Error resolving favourite movies: {e}")
+        title_ids = {}
+
+    # Try to find in candidate movies first, by id and then by normalized title
+    candidates_by_id = {}
+    candidates_by_title = {}
+    for movie in candidate_movies or []:
+        if movie.get("profile"):
+            candidates_by_id.setdefault(movie.get("id"), movie)
+            candidates_by_title.setdefault(normalize_movie_title(movie.get("title", "")), movie)
+
+    profiles = [None] * len(favorite_movies)
+    favourite_movie_objects = {}
     for i, fav_movie in enumerate(favorite_movies):
-        try:
-            print(f"DEBUG: Processing favorite movie {i+1}/{len(favorite_movies)}: {fav_movie}")
-            
-            # Try to find in candidate movies first
-            if candidate_movies:
-                for movie in candidate_movies:
-                    if is_same_movie(movie.get("title", ""), fav_movie):
-                        if "profile" in movie:
-                            valid_profiles.append(movie.get("profile"))
-                            print(f"DEBUG: Found profile in candidate movies for {fav_movie}")
-                            continue
-            
-            # If not found, search directly
-            movie_details = fetch_movie_by_title(fav_movie)
-            if movie_details:
-                movie_id = movie_details.get("id")
-                if movie_id:
-                    profile_result = build_enhanced_movie_profile(movie_id)
-                    if profile_result:
-                        profile_text = profile_result[0]
-                        valid_profiles.append(profile_text)
-                        continue
-            
+        movie_id = title_ids.get(fav_movie)
+        candidate = candidates_by_id.get(movie_id) or candidates_by_title.get(normalize_movie_title(fav_movie))
+        if candidate:
+            profiles[i] = candidate.get("profile")
+            print(f"DEBUG: Found profile in candidate movies for {fav_movie}")
+        elif movie_id:
+            favourite_movie_objects[i] = {"id": movie_id}
+
+    # Stored profiles are reused, the rest are built in parallel and stored for next time
+    add_enhanced_profiles_to_movies(list(favourite_movie_objects.values()), max_workers=max_workers)
+
+    for i, fav_movie in enumerate(favorite_movies):
+        if profiles[i] is None:
+            profile_text = favourite_movie_objects.get(i, {}).get("profile")
             # Fallback to simplified profile
-            simplified_profile = f"{fav_movie} {fav_movie} movie film cinema"
-            valid_profiles.append(simplified_profile)            
-        except Exception as e:
-            print(f"Error building profile for {fav_movie}: {e}")
-            minimal_profile = f"{fav_movie} movie"
-            valid_profiles.append(minimal_profile)
-    
-    print(f"DEBUG: Completed get_profiles_for_favorite_movies with {len(valid_profiles)} profiles")
-    return valid_profiles
+            profiles[i] = profile_text or f"{fav_movie} {fav_movie} movie film cinema"
+
+    print(f"DEBUG: Completed get_profiles_for_favorite_movies with {len(profiles)} profiles")
+    return profiles
+
+def add_retrieved_candidates(candidate_movies, favourite_profiles, top_k=None):
+    """ Merge the catalog movies most similar to the favourite profiles into the candidates """
+    if top_k is None:
+        top_k = config.RETRIEVAL_CANDIDATES
+
+    tfidf_model = get_tfidf_model()
+    if not top_k or not tfidf_model:
+        return candidate_movies
+
+    try:
+        similar_movies = tfidf_model.similar_movies(favourite_profiles, top_k=top_k)
+        known_ids = {movie.get("id") for movie in candidate_movies}
+        new_ids = [movie_id for movie_id, similarity in similar_movies if movie_id not in known_ids]
+
+        # Retrieved movies come from the local catalog, no extra TMDB calls
+        retrieved_movies = fetch_catalog_candidates(new_ids)
+        print(f"DEBUG: Retrieval added {len(retrieved_movies)} similar catalog movies to {len(candidate_movies)} candidates")
+        return candidate_movies + retrieved_movies
+    except Exception as e:
+        print(f"Error retrieving similar candidates: {e}")
+        return candidate_movies
 
 def get_fallback_recommendations(user_preferences):
     """ Provide fallback recommendations when normal process fails """
@@ -257,8 +294,7 @@ def get_fallback_recommendations(user_preferences):
         # If still no recommendations, just get popular movies
         if not recommendations:
             try:
-                url = f"https://api.themoviedb.org/3/movie/popular?api_key={TMDB_KEY}&language=en-US&page=1"
-                response = requests.get(url)
+                response = tmdb_client.get("/movie/popular", params={"language": "en-US", "page": 1})
                 if response.status_code == 200:
                     popular_movies = response.json().get("results", [])
                     recommendations.extend(popular_movies[:20])
@@ -278,72 +314,155 @@ def get_fallback_recommendations(user_preferences):
         return []
 
 
+def recommendation_row(movie):
+    """ Column values stored for a recommended movie, or None if it has no usable id """
+    try:
+        movie_id = int(movie.get("id", 0))
+    except (TypeError, ValueError):
+        return None
+    if not movie_id:
+        return None
+
+    # Get recommendation score
+    try:
+        rec_score = float(movie.get("recommendation_score", 0.0))
+    except (TypeError, ValueError):
+        rec_score = 0.0
+
+    try:
+        vote_average = float(movie.get("vote_average", 0.0))
+    except (TypeError, ValueError):
+        vote_average = 0.0
+
+    return {
+        "movie_id": movie_id,
+        "movie_title": str(movie.get("title", "")),
+        "poster_path": str(movie.get("poster_path", "")),
+        "overview": str(movie.get("overview", "")),
+        "recommendation_score": rec_score,
+        # Lists are stored as JSON
+        "genres": encode_list_for_db(movie.get("genres", [])),
+        "actors": encode_list_for_db(movie.get("actors", [])),
+        "release_date": str(movie.get("release_date", "")),
+        "vote_average": vote_average
+    }
+
+def is_same_recommendation_row(stored, row):
+    """ Check if a stored row already holds these values (FLOAT columns only keep about 6 digits) """
+    for column in ("movie_title", "poster_path", "overview", "release_date"):
+        if (stored.get(column) or "") != row[column]:
+            return False
+    for column in ("recommendation_score", "vote_average"):
+        if round(float(stored.get(column) or 0.0), 3) != round(row[column], 3):
+            return False
+    for column in ("genres", "actors"):
+        if parse_list_from_db(stored.get(column)) != json.loads(row[column]):
+            return False
+    return True
+
 def save_enhanced_recommendations(user_id, recommendations):
-    """ Save enhanced recommendations to the database """
+    """ Save recommendations, their explanations and the refresh time in one transaction, only writing rows that changed """
     connection = get_db_connection()
-    cursor = connection.cursor()
+    cursor = connection.cursor(dictionary=True)
 
     try:
-        # Delete all existing recommendations
-        cursor.execute("DELETE FROM user_recommendations WHERE user_id = %s", (user_id,))
-        print(f"Deleted {cursor.rowcount} old recommendations")
-        
-        # Add a set to track which movies we've already inserted
-        inserted_movie_ids = set()
-        
-        # Process each movie individually
-        successful_inserts = 0
-        for i, movie in enumerate(recommendations):
-            try:
-                movie_id = int(movie.get("id", 0))
-                if not movie_id:
-                    continue
-                
-                # Skip if we've already inserted this movie
-                if movie_id in inserted_movie_ids:
-                    continue
-                
-                inserted_movie_ids.add(movie_id)
-                
-                # Convert lists to strings for storage
-                genres_str = str(movie.get("genres", []))
-                actors_str = str(movie.get("actors", []))
-                
-                # Get recommendation score
-                try:
-                    rec_score = float(movie.get("recommendation_score", 0.0))
-                except (TypeError, ValueError):
-                    rec_score = 0.0
-                
-                # Adds results to the database
-                cursor.execute("""
-                    INSERT INTO user_recommendations 
-                    (user_id, movie_id, movie_title, poster_path, overview, 
-                     recommendation_score, genres, actors, release_date, vote_average) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    int(user_id), 
+        # One row per movie, the first (best scored) copy wins
+        rows = {}
+        explanations = {}
+        for movie in recommendations:
+            row = recommendation_row(movie)
+            if row and row["movie_id"] not in rows:
+                rows[row["movie_id"]] = row
+                explanations[row["movie_id"]] = (
+                    generate_recommendation_explanation(movie),
+                    json.dumps(movie.get("_score_breakdown", {}))
+                )
+
+        # Previous recommendations and explanations to diff against
+        cursor.execute("""
+            SELECT movie_id, movie_title, poster_path, overview, recommendation_score,
+                   genres, actors, release_date, vote_average
+            FROM user_recommendations WHERE user_id = %s
+        """, (user_id,))
+        stored_rows = {}
+        duplicate_ids = set()
+        for stored in cursor.fetchall():
+            if stored["movie_id"] in stored_rows:
+                duplicate_ids.add(stored["movie_id"])
+            stored_rows[stored["movie_id"]] = stored
+
+        cursor.execute("""
+            SELECT movie_id, explanation, aspects
+            FROM recommendation_explanations WHERE user_id = %s
+        """, (user_id,))
+        stored_explanations = {row["movie_id"]: (row["explanation"], row["aspects"]) for row in cursor.fetchall()}
+
+        # Changed rows are replaced, rows no longer recommended are removed
+        changed_ids = [
+            movie_id for movie_id, row in rows.items()
+            if movie_id in duplicate_ids or movie_id not in stored_rows or not is_same_recommendation_row(stored_rows[movie_id], row)
+        ]
+        removed_ids = [movie_id for movie_id in stored_rows if movie_id not in rows]
+        changed_explanation_ids = [
+            movie_id for movie_id, explanation in explanations.items()
+            if stored_explanations.get(movie_id) != explanation
+        ]
+        removed_explanation_ids = [movie_id for movie_id in stored_explanations if movie_id not in explanations]
+
+        delete_ids = changed_ids + removed_ids
+        if delete_ids:
+            placeholders = ', '.join(['%s'] * len(delete_ids))
+            cursor.execute(f"""
+                DELETE FROM user_recommendations
+                WHERE user_id = %s AND movie_id IN ({placeholders})
+            """, (user_id, *delete_ids))
+
+        if changed_ids:
+            cursor.executemany("""
+                INSERT INTO user_recommendations 
+                (user_id, movie_id, movie_title, poster_path, overview, 
+                 recommendation_score, genres, actors, release_date, vote_average) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (
+                    int(user_id),
                     movie_id,
-                    str(movie.get("title", "")),
-                    str(movie.get("poster_path", "")),
-                    str(movie.get("overview", "")),
-                    rec_score,  
-                    genres_str,
-                    actors_str,
-                    str(movie.get("release_date", "")),
-                    float(movie.get("vote_average", 0.0))
-                ))
-                successful_inserts += 1
-                
-            except Exception as e:
-                print(f"Error inserting movie #{i}: {e}")
-        
-        print(f"Successfully inserted {successful_inserts} movies")
-        
-        # Get current timestamp for metadata
+                    rows[movie_id]["movie_title"],
+                    rows[movie_id]["poster_path"],
+                    rows[movie_id]["overview"],
+                    rows[movie_id]["recommendation_score"],
+                    rows[movie_id]["genres"],
+                    rows[movie_id]["actors"],
+                    rows[movie_id]["release_date"],
+                    rows[movie_id]["vote_average"]
+                )
+                for movie_id in changed_ids
+            ])
+
+        if removed_explanation_ids:
+            placeholders = ', '.join(['%s'] * len(removed_explanation_ids))
+            cursor.execute(f"""
+                DELETE FROM recommendation_explanations
+                WHERE user_id = %s AND movie_id IN ({placeholders})
+            """, (user_id, *removed_explanation_ids))
+
+        # Explanations are unique per user and movie, so changed ones are upserted in place
+        if changed_explanation_ids:
+            cursor.executemany("""
+                INSERT INTO recommendation_explanations 
+                (user_id, movie_id, explanation, aspects, created_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                ON DUPLICATE KEY UPDATE
+                explanation = VALUES(explanation),
+                aspects = VALUES(aspects),
+                created_at = NOW()
+            """, [
+                (int(user_id), movie_id, explanations[movie_id][0], explanations[movie_id][1])
+                for movie_id in changed_explanation_ids
+            ])
+
+        # Update metadata table, this marks the recommendations as fresh even when nothing changed
         current_time = datetime.now()
-        
-        # Update metadata table
         cursor.execute("""
             INSERT INTO user_recommendations_metadata (user_id, last_updated) 
             VALUES (%s, %s) 
@@ -351,6 +470,9 @@ def save_enhanced_recommendations(user_id, recommendations):
         """, (int(user_id), current_time, current_time))
         
         connection.commit()
+        invalidate_stored_recommendations(user_id)
+        print(f"Saved {len(rows)} recommendations: {len(changed_ids)} written, {len(removed_ids)} removed, "
+              f"{len(changed_explanation_ids)} explanations written")
         return True
     except Exception as e:
         print(f"Fatal error in save_recommendations: {e}")
@@ -360,44 +482,6 @@ def save_enhanced_recommendations(user_id, recommendations):
         cursor.close()
         connection.close()
 
-def save_recommendation_explanations(user_id, recommendations):
-    """ Save explanations for why movies were recommended to a user """
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    
-    try:
-        # Clear previous explanations
-        cursor.execute("DELETE FROM recommendation_explanations WHERE user_id = %s", (user_id,))
-        
-        for movie in recommendations:
-            movie_id = movie.get('id')
-            score_breakdown = movie.get('_score_breakdown', {})
-            
-            # Generate explanation
-            explanation = generate_recommendation_explanation(movie)
-            
-            # Insert explanation into database
-            cursor.execute("""
-                INSERT INTO recommendation_explanations 
-                (user_id, movie_id, explanation, aspects, created_at)
-                VALUES (%s, %s, %s, %s, NOW())
-            """, (
-                user_id,
-                movie_id,
-                explanation,
-                json.dumps(score_breakdown)
-            ))
-        
-        connection.commit()
-        return True
-    except Exception as e:
-        connection.rollback()
-        print(f"Error saving recommendation explanations: {e}")
-        return False
-    finally:
-        cursor.close()
-        connection.close()
-
 def generate_recommendation_explanation(movie):
     """ Generate explanation for why this movie was recommended """
     score_breakdown = movie.get("_score_breakdown", {})
@@ -459,131 +543,194 @@ def generate_recommendation_explanation(movie):
     
     return explanation
 
-@cache_decorator(ttl=3600)  # Cache for 1 hour    
-def fetch_movies_for_user(current_user, user_preferences):
+def fetch_movies_for_user(current_user):
     """ Fetch candidate movies for recommendations """
-    from flask import current_app, request
-    from config import is_production
+    # Called in-process and shares the /movies route's cache, so a recommendation run never waits on a second worker.
+    # The pipeline adds profile fields to candidates, so it works on a copy and never changes the cached list
+    try:
+        return copy.deepcopy(get_candidate_movies(current_user) or [])
+    except Exception as e:
+        print(f"Error fetching candidate movies: {e}")
+        return []
+
+def apply_stored_profile(movie, profile_data):
+    """ Copy a movie_enhanced_profiles row onto a movie object """
+    movie["profile"] = profile_data.get("profile_text")
+    movie["themes"] = json.loads(profile_data.get("themes") or "[]")
+    movie["tones"] = json.loads(profile_data.get("tones") or "[]")
+    movie["target_audience"] = profile_data.get("target_audience")
+    movie["franchises"] = json.loads(profile_data.get("franchises") or "[]")
+    movie["core_concepts"] = json.loads(profile_data.get("core_concepts") or "[]")
+    return movie
+
+def apply_built_profile(movie, profile_text, enhanced_elements):
+    """ Copy a freshly built profile onto a movie object """
+    movie["profile"] = profile_text
+    movie["themes"] = enhanced_elements.get("themes", [])
+    movie["tones"] = enhanced_elements.get("tones", [])
+    movie["target_audience"] = enhanced_elements.get("target_audience", "general")
+    movie["franchises"] = enhanced_elements.get("franchises", [])
+    movie["core_concepts"] = enhanced_elements.get("core_concepts", [])
     
-    # Auto-detect environment and set appropriate base URL
-    if is_production():
-        # Production environment (Render)
-        BASE_URL = os.getenv('API_BASE_URL', 'https://suggestify-backend-cuvb.onrender.com')
-    else:
-        # Local development
-        BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:5000')
+    # Add additional details if not present
+    if "genres" not in movie:
+        movie["genres"] = enhanced_elements.get("genres", [])
+    if "actors" not in movie:
+        movie["actors"] = enhanced_elements.get("actors", [])
+    return movie
+
+def get_stored_profiles(movie_ids):
+    """ Get stored enhanced profiles for several movies with a single query """
+    if not movie_ids:
+        return {}
+
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
     
-    movies_url = f"{BASE_URL}/movies"
+    try:
+        placeholders = ', '.join(['%s'] * len(movie_ids))
+        cursor.execute(f"""
+            SELECT * FROM movie_enhanced_profiles
+            WHERE movie_id IN ({placeholders})
+        """, tuple(movie_ids))
+        return {row['movie_id']: row for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        connection.close()
+
+def save_enhanced_profiles(built_profiles):
+    """ Store newly built profiles with one multi-row upsert """
+    if not built_profiles:
+        return
 
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    
     try:
-        response = requests.get(
-            movies_url,
-            headers={"Authorization": request.headers.get("Authorization")},
-        )
-        print(f"DEBUG: Response status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            all_movies = response.json().get("movies", [])
-            print(f"DEBUG: Successfully got {len(all_movies)} movies")
-            return all_movies
-        else:
-            print(f"DEBUG: Failed to fetch movies: {response.status_code}")
-            print(f"DEBUG: Response content: {response.text[:200]}...")
-            return []
-    except requests.exceptions.ConnectionError as e:
-        print(f"DEBUG: Connection error to /movies: {e}")
-        return []
+        cursor.executemany("""
+            INSERT INTO movie_enhanced_profiles
+            (movie_id, profile_text, themes, tones, target_audience, franchises, core_concepts)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            profile_text = VALUES(profile_text),
+            themes = VALUES(themes),
+            tones = VALUES(tones),
+            target_audience = VALUES(target_audience),
+            franchises = VALUES(franchises),
+            core_concepts = VALUES(core_concepts)
+        """, [
+            (
+                movie_id,
+                profile_text,
+                json.dumps(enhanced_elements.get("themes", [])),
+                json.dumps(enhanced_elements.get("tones", [])),
+                enhanced_elements.get("target_audience", "general"),
+                json.dumps(enhanced_elements.get("franchises", [])),
+                json.dumps(enhanced_elements.get("core_concepts", []))
+            )
+            for movie_id, (profile_text, enhanced_elements) in built_profiles.items()
+        ])
+        connection.commit()
     except Exception as e:
-        print(f"DEBUG: Unexpected error in fetch_movies_for_user: {e}")
-        return []
+        connection.rollback()
+        print(f"Error saving enhanced profiles: {e}")
+    finally:
+        cursor.close()
+        connection.close()
 
-def add_enhanced_profile_to_movie(movie):
-    """Add enhanced profile data to a movie object."""
-    if not movie or "id" not in movie:
-        return movie
+def add_enhanced_profiles_to_movies(movies, max_workers=8):
+    """ Add enhanced profile data to several movies, building and storing only the missing profiles """
+    # Only movies without enhanced profile info need looking up
+    pending = {}
+    for movie in movies:
+        if movie and movie.get("id") and not ("profile" in movie and "themes" in movie):
+            try:
+                pending.setdefault(int(movie["id"]), []).append(movie)
+            except (TypeError, ValueError):
+                continue
     
-    # Check if we already have enhanced profile info
-    if "profile" in movie and "themes" in movie:
-        return movie
-        
-    movie_id = movie.get("id")
+    if not pending:
+        return movies
+
+    # Get every stored profile in one query
+    try:
+        stored_profiles = get_stored_profiles(list(pending))
+    except Exception as e:
+        print(f"Database error in add_enhanced_profiles_to_movies: {e}")
+        stored_profiles = {}
+
+    for movie_id, profile_data in stored_profiles.items():
+        for movie in pending.get(movie_id, []):
+            try:
+                apply_stored_profile(movie, profile_data)
+            except (TypeError, ValueError) as e:
+                print(f"Error decoding enhanced profile for movie {movie_id}: {e}")
+
+    # If not in database, generate the missing profiles in parallel
+    missing_ids = [movie_id for movie_id in pending if movie_id not in stored_profiles]
+    if not missing_ids:
+        return movies
+
+    bundles = fetch_movie_bundles(missing_ids, max_workers=max_workers)
+
+    def build(movie_id):
+        try:
+            return build_enhanced_movie_profile(movie_id, bundles.get(movie_id)) if bundles.get(movie_id) else None
+        except Exception as e:
+            print(f"Error generating enhanced profile for movie {movie_id}: {e}")
+            return None
+
+    built_profiles = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for movie_id, profile_result in zip(missing_ids, executor.map(build, missing_ids)):
+            if profile_result and len(profile_result) >= 3:
+                profile_text, enhanced_elements, movie_details = profile_result
+                built_profiles[movie_id] = (profile_text, enhanced_elements)
+                for movie in pending[movie_id]:
+                    apply_built_profile(movie, profile_text, enhanced_elements)
+
+    # Store in database for future use
+    save_enhanced_profiles(built_profiles)
     
-    # Try to get enhanced profile from the database first
+    return movies
+
+def load_scoring_context(user_id, user_preference_model=None):
+    """ Load the user-level data needed to score candidates, once per recommendation run """
+    scoring_context = {
+        "liked_themes": [],
+        "liked_tones": [],
+        "liked_franchises": [],
+        "target_age": None
+    }
+
+    if not user_preference_model:
+        return scoring_context
+
+    # Get user's liked themes, tones and franchises from successful recommendations
+    scoring_context["liked_themes"] = list(user_preference_model.theme_ratings.keys())
+    scoring_context["liked_tones"] = list(user_preference_model.tone_ratings.keys())
+    scoring_context["liked_franchises"] = list(user_preference_model.franchise_ratings.keys())
+
+    # Get the audience preferences from database
     connection = get_db_connection()
     cursor = connection.cursor(dictionary=True)
     
     try:
         cursor.execute("""
-            SELECT * FROM movie_enhanced_profiles
-            WHERE movie_id = %s
-        """, (movie_id,))
-        
-        profile_data = cursor.fetchone()
+            SELECT target_age FROM user_style_preferences
+            WHERE user_id = %s
+        """, (user_id,))
         
-        if profile_data:
-            # Add profile data to the movie
-            movie["profile"] = profile_data.get("profile_text")
-            movie["themes"] = json.loads(profile_data.get("themes", "[]"))
-            movie["tones"] = json.loads(profile_data.get("tones", "[]"))
-            movie["target_audience"] = profile_data.get("target_audience")
-            movie["franchises"] = json.loads(profile_data.get("franchises", "[]"))
-            movie["core_concepts"] = json.loads(profile_data.get("core_concepts", "[]"))
-            
-            return movie
-            
-        # If not in database, generate and store
-        try:
-            profile_result = build_enhanced_movie_profile(movie_id)
-            
-            if profile_result and len(profile_result) >= 3:
-                profile_text, enhanced_elements, movie_details = profile_result
-                
-                # Update the movie with enhanced data
-                movie["profile"] = profile_text
-                movie["themes"] = enhanced_elements.get("themes", [])
-                movie["tones"] = enhanced_elements.get("tones", [])
-                movie["target_audience"] = enhanced_elements.get("target_audience", "general")
-                movie["franchises"] = enhanced_elements.get("franchises", [])
-                movie["core_concepts"] = enhanced_elements.get("core_concepts", [])
-                
-                # Add additional details if not present
-                if "genres" not in movie:
-                    movie["genres"] = enhanced_elements.get("genres", [])
-                if "actors" not in movie:
-                    movie["actors"] = enhanced_elements.get("actors", [])
-                
-                # Store in database for future use
-                cursor.execute("""
-                    INSERT INTO movie_enhanced_profiles
-                    (movie_id, profile_text, themes, tones, target_audience, franchises, core_concepts)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    profile_text = VALUES(profile_text),
-                    themes = VALUES(themes),
-                    tones = VALUES(tones),
-                    target_audience = VALUES(target_audience),
-                    franchises = VALUES(franchises),
-                    core_concepts = VALUES(core_concepts)
-                """, (
-                    movie_id,
-                    profile_text,
-                    json.dumps(enhanced_elements.get("themes", [])),
-                    json.dumps(enhanced_elements.get("tones", [])),
-                    enhanced_elements.get("target_audience", "general"),
-                    json.dumps(enhanced_elements.get("franchises", [])),
-                    json.dumps(enhanced_elements.get("core_concepts", []))
-                ))
-                
-                connection.commit()
-        except Exception as e:
-            print(f"Error generating enhanced profile for movie {movie_id}: {e}")
+        pref_result = cursor.fetchone()
+        if pref_result and pref_result.get('target_age'):
+            scoring_context["target_age"] = pref_result.get('target_age')
     except Exception as e:
-        print(f"Database error in add_enhanced_profile_to_movie: {e}")
+        print(f"Error getting audience preference: {e}")
     finally:
         cursor.close()
         connection.close()
-    
-    return movie
+
+    return scoring_context
 
 def compute_enhanced_recommendations(user_id, candidate_movies, user_preferences, favourite_profiles, user_preference_model=None, top_n=20):
     """ Compute movie recommendations with user preference model """
@@ -612,44 +759,44 @@ def compute_enhanced_recommendations(user_id, candidate_movies, user_preferences
         watchlist_preferences = {"all_watchlist_movie_ids": [], "liked_genres": [], "liked_actors": []}
         watchlist_movie_ids = []
     
-    # Get user's favorite movies and convert to lowercase for comparison
+    # Index the user's favorite movies by TMDB id and by title word for hash lookups
     try:
         favorite_movies = parse_list_from_db(user_preferences.get("favourite_movies", []))
-        favorite_movies_lower = [movie.lower() for movie in favorite_movies]
+        favorite_title_words = index_title_words(favorite_movies)
     except Exception as e:
         print(f"Error processing favorite movies: {e}")
         favorite_movies = []
-        favorite_movies_lower = []
+        favorite_title_words = {}
+
+    try:
+        favorite_movie_ids = {str(movie_id) for movie_id in get_indexed_titles(favorite_movies).values()}
+    except Exception as e:
+        print(f"Error reading favourite movie ids: {e}")
+        favorite_movie_ids = set()
     
     # Remove movies already in watchlist or favorites
     filtered_candidates_final = []
     skipped_watchlist = 0
     skipped_favorites = 0
     
+    # Add enhanced profile data to every candidate that doesn't have it yet, in one batch
+    add_enhanced_profiles_to_movies(filtered_candidates)
+    watchlist_ids = {str(wl_id) for wl_id in watchlist_movie_ids}
+    
     for i, movie in enumerate(filtered_candidates):
         try:
             # Skip if missing required fields
             if not movie.get("id") or not movie.get("title"):
                 continue
             
-            # Add enhanced profile data if not already present
-            if "profile" not in movie or "themes" not in movie:
-                movie = add_enhanced_profile_to_movie(movie)
-            
             # Skip if in watchlist
             movie_id = str(movie["id"]) if movie["id"] is not None else None
-            if movie_id and any(str(movie_id) == str(wl_id) for wl_id in watchlist_movie_ids):
+            if movie_id and movie_id in watchlist_ids:
                 skipped_watchlist += 1
                 continue
                 
-            # Skip if it's a favorite movie
-            is_favorite = False
-            movie_title = movie.get("title", "").lower()
-            for fav in favorite_movies_lower:
-                if is_same_movie(movie_title, fav):
-                    is_favorite = True
-                    break
-            if is_favorite:
+            # Skip if it's a favorite movie (or shares a favourite's title, e.g. a sequel)
+            if movie_id in favorite_movie_ids or matches_indexed_title(movie.get("title", ""), favorite_title_words):
                 skipped_favorites += 1
                 continue
                 
@@ -700,26 +847,28 @@ def compute_enhanced_recommendations(user_id, candidate_movies, user_preferences
         print(f"DEBUG: Error creating boosted profiles: {e}")
         boosted_profiles = favourite_profiles.copy()
 
-    # Compute TF-IDF similarity 
-    vectorizer = TfidfVectorizer(
-        stop_words="english",
-        sublinear_tf=True,
-        norm="l2",
-        max_df=0.85,
-        min_df=2
-    )
-
     # Compute similarity if we have valid profiles
     similarity_scores = None
+    tfidf_matrix = None
     if movie_profiles and boosted_profiles:
         try:
-            tfidf_matrix = vectorizer.fit_transform(movie_profiles)
-            favorite_tfidf_matrix = vectorizer.transform(boosted_profiles)
+            # Use the catalog-wide model and its stored movie vectors when one has been built,
+            # otherwise fit a vectorizer on this request's candidates
+            tfidf_model = get_tfidf_model()
+            if tfidf_model:
+                movie_ids = [filtered_candidates_final[i].get("id") for i in movie_indices]
+                tfidf_matrix = tfidf_model.candidate_matrix(movie_ids, movie_profiles)
+                favorite_tfidf_matrix = tfidf_model.transform(boosted_profiles)
+            else:
+                vectorizer = new_vectorizer()
+                tfidf_matrix = vectorizer.fit_transform(movie_profiles)
+                favorite_tfidf_matrix = vectorizer.transform(boosted_profiles)
             similarity_scores = cosine_similarity(favorite_tfidf_matrix, tfidf_matrix)
             print("Successfully computed similarity scores")
         except Exception as e:
             print(f"Error computing similarity: {e}")
             similarity_scores = None
+            tfidf_matrix = None
     else:
         print("Not enough profiles for similarity computation")
     
@@ -730,429 +879,221 @@ def compute_enhanced_recommendations(user_id, candidate_movies, user_preferences
         # If similarity comparison fails
         max_scores = np.ones(len(movie_indices)) * 0.5
 
-    # Score and rank movies 
-    scored_movies = []
-    
-    # Define default weights if none provided
-    if not weights:
-        weights = {
-            "base_similarity": 0.2,
-            "genre_match": 0.3,
-            "actor_match": 0.15,
-            "theme_match": 0.15,
-            "tone_match": 0.05,
-            "franchise_match": 0.05,
-            "audience_match": 0.05,
-            "rating_boost": 0.05
-        }
+    # Load user-level scoring data once, the scoring stage itself does no I/O
+    scoring_context = load_scoring_context(user_id, user_preference_model)
+    scoring_context["combined_genres"] = combined_genres
+    scoring_context["combined_actors"] = combined_actors
+
+    # Score and rank movies, keeping only the best ones plus a buffer for the diversity filter
+    scored_movies = score_candidate_movies(
+        filtered_candidates_final, movie_indices, max_scores, weights, scoring_context,
+        limit=max(top_n, 20) + config.DIVERSITY_BUFFER
+    )
     
-    for idx, i in enumerate(movie_indices):
-        try:
-            movie = filtered_candidates_final[i]
-            
-            # Base similarity score (from TF-IDF)
-            base_score = max_scores[idx] if idx < len(max_scores) else 0.5
-            base_score = base_score * weights.get("base_similarity", 0.2)
-
-            # Genre match boost
-            movie_genres = movie.get("genres", [])
-            if not isinstance(movie_genres, list):
-                movie_genres = []
-                
-            matching_genres = sum(1 for genre in movie_genres if genre in combined_genres)
-            if combined_genres:
-                genre_boost = min(matching_genres / len(combined_genres), 1.0) * weights.get("genre_match", 0.3)
-            else:
-                genre_boost = 0
+    # Ensure diversity in recommendations (MMR re-ranks with the profile vectors computed above)
+    movie_vectors = None
+    if config.DIVERSITY_STRATEGY == "mmr":
+        profiled_ids = [filtered_candidates_final[i].get("id") for i in movie_indices]
+        movie_vectors = align_movie_vectors(scored_movies, profiled_ids, tfidf_matrix)
 
-            # Actor match boost
-            movie_actors = movie.get("actors", [])
-            if not isinstance(movie_actors, list):
-                movie_actors = []
-                
-            matching_actors = sum(1 for actor in movie_actors if actor in combined_actors)
-            if matching_actors > 0:
-                actor_boost = min(matching_actors / 3, 1.0) * weights.get("actor_match", 0.15)
-            else:
-                actor_boost = 0
-            
-            # Theme match boost
-            movie_themes = movie.get("themes", [])
-            if not isinstance(movie_themes, list):
-                movie_themes = []
-            
-            # Get user's liked themes from successful recommendations if we have a preference model
-            liked_themes = []
-            if user_preference_model:
-                liked_themes = list(user_preference_model.theme_ratings.keys())
-            
-            matching_themes = sum(1 for theme in movie_themes if theme in liked_themes)
-            if liked_themes:
-                theme_boost = min(matching_themes / len(liked_themes), 1.0) * weights.get("theme_match", 0.15)
-            else:
-                theme_boost = 0
-            
-            # Tone match boost
-            movie_tones = movie.get("tones", [])
-            if not isinstance(movie_tones, list):
-                movie_tones = []
-            
-            # Get user's liked tones from successful recommendations if we have a preference model
-            liked_tones = []
-            if user_preference_model:
-                liked_tones = list(user_preference_model.tone_ratings.keys())
-            
-            matching_tones = sum(1 for tone in movie_tones if tone in liked_tones)
-            if liked_tones:
-                tone_boost = min(matching_tones / len(liked_tones), 1.0) * weights.get("tone_match", 0.05)
-            else:
-                tone_boost = 0
-            
-            # Franchise match boost
-            movie_franchises = movie.get("franchises", [])
-            if not isinstance(movie_franchises, list):
-                movie_franchises = []
-            
-            # Get user's liked franchises from successful recommendations if we have a preference model
-            liked_franchises = []
-            if user_preference_model:
-                liked_franchises = list(user_preference_model.franchise_ratings.keys())
-
-            franchise_boost = 0
-
-            matching_franchises = sum(1 for franchise in movie_franchises if franchise in liked_franchises)
-            if liked_franchises:
-                if matching_franchises > 0:
-                    franchise_boost = min(matching_franchises / len(liked_franchises), 1.0) * weights.get("franchise_match", 0.3) * 3.0
-                else:
-                    franchise_boost = 0
-            
-            # Target audience match
-            target_audience = movie.get("target_audience", "general")
-            audience_boost = 0
-            
-            # If we have a preference model, check for target audience match
-            if user_preference_model:
-                # Get the audience preferences from database
-                connection = get_db_connection()
-                cursor = connection.cursor(dictionary=True)
-                
-                try:
-                    cursor.execute("""
-                        SELECT target_age FROM user_style_preferences
-                        WHERE user_id = %s
-                    """, (user_id,))
-                    
-                    pref_result = cursor.fetchone()
-                    if pref_result and pref_result.get('target_age'):
-                        preferred_audience = pref_result.get('target_age')
-                        if preferred_audience == target_audience:
-                            audience_boost = weights.get("audience_match", 0.05)
-                        elif target_audience == "general":
-                            audience_boost = weights.get("audience_match", 0.05) * 0.5
-                except Exception as e:
-                    print(f"Error getting audience preference: {e}")
-                finally:
-                    cursor.close()
-                    connection.close()
-            
-            # Rating boost
-            rating_boost = 0
-            vote_average = movie.get("vote_average")
-            vote_count = movie.get("vote_count", 0)
-            
-            if vote_average is not None and vote_count is not None and vote_count > 50:
-                try:
-                    avg_rating = float(vote_average)
-                    rating_boost = min(avg_rating / 10, 1.0) * weights.get("rating_boost", 0.05)
-                except (TypeError, ValueError) as e:
-                    print(f"DEBUG: Error processing rating: {e}")
-
-            # Calculate final score
-            final_score = base_score + genre_boost + actor_boost + theme_boost + tone_boost + franchise_boost + audience_boost + rating_boost
-            
-            # Add the scored movie to our list with score breakdown
-            scored_movie = dict(movie)
-            scored_movie["recommendation_score"] = round(final_score, 3)
-            
-            # Add score breakdown
-            scored_movie["_score_breakdown"] = {
-                "base_score": round(base_score, 3),
-                "genre_boost": round(genre_boost, 3),
-                "actor_boost": round(actor_boost, 3),
-                "theme_score": round(theme_boost, 3),
-                "tone_score": round(tone_boost, 3),
-                "franchise_score": round(franchise_boost, 3),
-                "audience_score": round(audience_boost, 3),
-                "rating_boost": round(rating_boost, 3)
-            }          
-            scored_movies.append(scored_movie)
-        except Exception as e:
-            print(f"DEBUG: Error scoring movie: {e}")
+    diverse_recommendations = ensure_diversity(
+        scored_movies,
+        max_per_genre=5,
+        top_n=20,
+        strategy=config.DIVERSITY_STRATEGY,
+        movie_vectors=movie_vectors,
+        mmr_lambda=config.MMR_LAMBDA
+    )
+      
+    return diverse_recommendations[:top_n]
+
+def get_user_id(email):
+    """ Get a user's id from their email, or None if they don't exist """
+    connection = get_db_connection()
+    cursor = connection.cursor()
+
+    try:
+        cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
+        user_result = cursor.fetchone()
+        return user_result[0] if user_result else None
+    finally:
+        cursor.close()
+        connection.close()
+
+def generate_recommendations(user_id, current_user):
+    """ Run the full recommendation pipeline for a user and store the results """
+    print(f"Generating new recommendations for user {user_id}")
+    user_preferences = get_user_preferences(current_user)
+    if not user_preferences:
+        raise LookupError("User preferences not found")
     
-    # Sort by final score
-    print("DEBUG: Sorting recommendations")
+    print("user preferences", user_preferences) 
+    # Get watchlist data for the user preference model
+    watchlist_prefs = get_user_watchlist_preferences(user_id)
+    watchlist_items = watchlist_prefs.get('all_watchlist_items', [])
+    
+    print("Received watchlist preferences")
+    # Build the enhanced user preference model
     try:
-        scored_movies.sort(key=lambda x: x.get("recommendation_score", 0), reverse=True)
+        user_model = build_user_preference_model(user_id, watchlist_items, user_preferences)
     except Exception as e:
-        print(f"DEBUG: Error sorting recommendations: {e}")
+        print(f"Error building user model: {e}")
+        user_model = None
     
-    # Ensure diversity in recommendations
-    diverse_recommendations = ensure_diversity(scored_movies, max_per_genre=5, top_n=20)
-      
-    return diverse_recommendations[:top_n]
+    # Get favourite movies
+    favorite_movies = user_preferences.get("favourite_movies", [])
+    favorite_movies = parse_list_from_db(favorite_movies)
+    print("favorite movies", favorite_movies)
 
-def ensure_diversity(scored_movies, max_per_genre=5, top_n=20):
-    """ Diversity filter with balance between relevance and variety."""
-    genres_count = {}
-    diverse_results = []
+    if not favorite_movies:
+        print("Warning: No favorite movies in preferences")
+        favorite_movies = ["action", "comedy", "romance", "adventure"] # Generic movie genre incase all fails
     
-    # Safety check for empty input
-    if not scored_movies:
-        print("WARNING: No scored movies provided to diversity filter")
-        return []
+    print("Now sending data to movies route")
+    # Get candidate movies
+    candidate_movies = fetch_movies_for_user(current_user)
     
-    # Include top 5 movies regardless of genre 
-    top_count = min(5, len(scored_movies))
-    for idx in range(top_count):
-        movie = scored_movies[idx]
-        diverse_results.append(movie)
-        
-        # Track genres for these movies
-        movie_genres = movie.get("genres", ["Unknown"])
-        if not isinstance(movie_genres, list):
-            movie_genres = ["Unknown"]
-            
-        for genre in movie_genres[:2]:
-            genre_str = str(genre)
-            if genre_str not in genres_count:
-                genres_count[genre_str] = 0
-            genres_count[genre_str] += 1
+    # Check if we have candidates
+    if not candidate_movies:
+        candidate_movies = get_fallback_recommendations(user_preferences)
     
-    # Apply diversity filter for remaining slots
-    for movie in scored_movies:
-        # Skip movies we've already added
-        if movie in diverse_results:
-            continue
-            
-        movie_genres = movie.get("genres", ["Unknown"])
-        if not isinstance(movie_genres, list):
-            movie_genres = ["Unknown"]
-        elif len(movie_genres) == 0:
-            movie_genres = ["Unknown"]
-        
-        # Check if this movie would exceed genre caps
-        exceeds_cap = False
-        for genre in movie_genres[:2]:
-            genre_str = str(genre)
-            if genre_str in genres_count and genres_count[genre_str] >= max_per_genre:
-                exceeds_cap = True
-                break
-        
-        # If very high score, add despite genre cap
-        max_score = scored_movies[0].get("recommendation_score", 0) if scored_movies else 0
-        high_score_threshold = max_score * 0.8
-        movie_score = movie.get("recommendation_score", 0)
-        is_high_score = movie_score >= high_score_threshold if high_score_threshold > 0 else False
-        
-        if not exceeds_cap or is_high_score:
-            diverse_results.append(movie)
-            
-            # Update genre counts
-            for genre in movie_genres[:2]:
-                genre_str = str(genre)
-                if genre_str not in genres_count:
-                    genres_count[genre_str] = 0
-                genres_count[genre_str] += 1
-        
-        # Stop once we have enough recommendations
-        if len(diverse_results) >= top_n:
-            break
+    # Get valid favorite profiles
+    valid_favorite_profiles = get_profiles_for_favorite_movies(favorite_movies, candidate_movies)
+    
+    # Check if we have profiles
+    if not valid_favorite_profiles:
+        print("Warning: No valid favorite profiles, creating generic profiles")
+        valid_favorite_profiles = [
+            "movie action adventure thriller exciting",
+            "movie comedy funny entertaining lighthearted",
+            "movie drama emotional moving powerful"
+        ]
     
-    # If we still need more, add remaining movies
-    if len(diverse_results) < top_n:
-        for movie in scored_movies:
-            if movie not in diverse_results and len(diverse_results) < top_n:
-                diverse_results.append(movie)
+    # Add similar movies from the catalog the TMDB lists didn't include
+    candidate_movies = add_retrieved_candidates(candidate_movies, valid_favorite_profiles)
+    
+    # Compute recommendations
+    recommendations = compute_enhanced_recommendations(
+        user_id=user_id,
+        candidate_movies=candidate_movies,
+        user_preferences=user_preferences,
+        favourite_profiles=valid_favorite_profiles,
+        user_preference_model=user_model,
+        top_n=20
+    )
     
-    return diverse_results[:top_n]
+    # Check if we have recommendations
+    if not recommendations:
+        print("Warning: No recommendations generated, using fallback")
+        recommendations = get_fallback_recommendations(user_preferences)
+    
+    # With nothing to store the recommendations would stay stale, so fail the job and let
+    # JOB_RETRY_SECONDS stop /recommend from queueing a new run on every poll
+    if not any(recommendation_row(movie) for movie in recommendations):
+        raise LookupError("No recommendations could be generated")
+
+    # Save recommendations
+    saved = save_enhanced_recommendations(user_id, recommendations)
+    if not saved:
+        raise RuntimeError("Failed to save recommendations")
+    
+    print(f"Successfully generated {len(recommendations)} recommendations")
+    for i, movie in enumerate(recommendations, 1):
+        print(f"{i}. {movie['title']}")
+    return {"count": len(recommendations)}
+
+def enqueue_recommendation_job(user_id, current_user):
+    """ Queue a background refresh of a user's recommendations (one at a time per user) """
+    return job_queue.submit(
+        "recommendations",
+        f"recommendations:{user_id}",
+        generate_recommendations,
+        user_id,
+        current_user,
+        owner=user_id,
+        retry_after=config.JOB_RETRY_SECONDS
+    )
+
+def job_response(job):
+    """ Job fields that are safe to return to the client """
+    return {key: job.get(key) for key in ("id", "type", "status", "created_at", "started_at", "finished_at", "result", "error")}
 
 @recommendations_bp.route("/recommend", methods=["GET"])
 @token_required
 def recommend_movies(current_user):
-    """ Generate movie recommendations """
-    print(f"Recommendation process has begun for {current_user}")
-
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    user_id = None
-    user_preferences = None
+    """ Serve stored recommendations, refreshing them in the background when they are out of date """
+    print(f"Recommendation request for {current_user}")
 
     try: 
         # Get the user ID from email
-        cursor.execute("SELECT id FROM users WHERE email = %s", (current_user,))
-        user_result = cursor.fetchone()
-        if not user_result:
-            cursor.close()
-            connection.close()
+        user_id = get_user_id(current_user)
+        if not user_id:
             return jsonify({"error": "User not found"}), 404
-    
-        user_id = user_result[0]
-        cursor.close()
-        connection.close()
 
-        # Check if already generating recommendations
-        if not check_and_set_lock(user_id):
-            print(f"Recommendations generation in progress for user {user_id}")
-            
-            # Return stored recommendations with status
-            stored_recs = get_stored_recommendations(user_id)
-            if stored_recs:
-                for rec in stored_recs:
-                    try:
-                        rec['genres'] = parse_list_from_db(rec['genres'])
-                        rec['actors'] = parse_list_from_db(rec['actors'])
-                    except:
-                        if 'genres' not in rec:
-                            rec['genres'] = []
-                        if 'actors' not in rec:
-                            rec['actors'] = []
-                return jsonify({
-                    "recommended_movies": stored_recs, 
-                    "status": "generating"
-                })
-            else:
-                return jsonify({
-                    "recommended_movies": [], 
-                    "status": "generating"
-                })
+        # Check if we need to refresh recommendations
+        if not should_refresh_recommendations(user_id):
+            print("No need to refresh recommendations. Returning stored recommendations")
+            return recommendations_response(get_stored_recommendations_payload(user_id))
 
-        try:
-            # Check if we need to refresh recommendations
-            need_to_refresh = should_refresh_recommendations(user_id)
-
-            if not need_to_refresh:
-                print("No need to refresh recommendations. Returning stored recommendations")
-                release_lock(user_id)
-                stored_recs = get_stored_recommendations(user_id)
-                if stored_recs:
-                    for rec in stored_recs:
-                        try:
-                            rec['genres'] = parse_list_from_db(rec['genres'])
-                            rec['actors'] = parse_list_from_db(rec['actors'])
-                        except:
-                            if 'genres' not in rec:
-                                rec['genres'] = []
-                            if 'actors' not in rec:
-                                rec['actors'] = []
-                    return jsonify({"recommended_movies": stored_recs}) 
-                
-            # Generate new recommendations
-            print("Generating new recommendations") 
-            user_preferences = get_user_preferences(current_user)
-            if not user_preferences:
-                release_lock(user_id)
-                return jsonify({"error": "User preferences not found"}), 404
-            
-            print("user preferences", user_preferences) 
-            # Get watchlist data for the user preference model
-            watchlist_prefs = get_user_watchlist_preferences(user_id)
-            watchlist_items = watchlist_prefs.get('all_watchlist_items', [])
-            
-            print("Received watchlist preferences")
-            # Build the enhanced user preference model
-            try:
-                user_model = build_user_preference_model(user_id, watchlist_items, user_preferences)
-            except Exception as e:
-                print(f"Error building user model: {e}")
-                user_model = None
-            
-            # Get favourite movies
-            favorite_movies = user_preferences.get("favourite_movies", [])
-            favorite_movies = parse_list_from_db(favorite_movies)
-            print("favorite movies", favorite_movies)
-
-            if not favorite_movies:
-                print("Warning: No favorite movies in preferences")
-                favorite_movies = ["action", "comedy", "romance", "adventure"] # Generic movie genre incase all fails
-            
-            print("Now sending data to movies route")
-            # Get candidate movies
-            candidate_movies = fetch_movies_for_user(current_user, user_preferences)
-            
-            # Check if we have candidates
-            if not candidate_movies:
-                candidate_movies = get_fallback_recommendations(user_preferences)
-            
-            # Get valid favorite profiles
-            valid_favorite_profiles = get_profiles_for_favorite_movies(favorite_movies, candidate_movies)
-            
-            # Check if we have profiles
-            if not valid_favorite_profiles:
-                print("Warning: No valid favorite profiles, creating generic profiles")
-                valid_favorite_profiles = [
-                    "movie action adventure thriller exciting",
-                    "movie comedy funny entertaining lighthearted",
-                    "movie drama emotional moving powerful"
-                ]
-            
-            # Compute recommendations
-            recommendations = compute_enhanced_recommendations(
-                user_id=user_id,
-                candidate_movies=candidate_movies,
-                user_preferences=user_preferences,
-                favourite_profiles=valid_favorite_profiles,
-                user_preference_model=user_model,
-                top_n=20
-            )
-            
-            # Check if we have recommendations
-            if not recommendations:
-                print("Warning: No recommendations generated, using fallback")
-                recommendations = get_fallback_recommendations(user_preferences)
-            
-            # Save recommendations
-            if recommendations:
-                saved = save_enhanced_recommendations(user_id, recommendations)
-                save_recommendation_explanations(user_id, recommendations)
-                if not saved:
-                    print("Warning: Failed to save recommendations")
-            
-            # Release the lock
-            release_lock(user_id)
-            
-            # Clean up recommendations for output
-            for rec in recommendations:
-                if '_score_breakdown' in rec:
-                    rec.pop('_score_breakdown')
-            
-            print(f"Successfully generated {len(recommendations)} recommendations")
-            for i, movie in enumerate(recommendations, 1):
-                print(f"{i}. {movie['title']}")
-            return jsonify({"recommended_movies": recommendations})
-        except Exception as e:
-            print(f"Error during recommendation generation: {e}")
-            # Make sure to release the lock in case of error
-            release_lock(user_id)
-            
-            # Try to return something useful
-            try:
-                if not stored_recs:
-                    fallback_recs = get_fallback_recommendations(user_preferences)
-                    print("Returning fallback recommendations")
-                    return jsonify({"recommended_movies": fallback_recs, "status": "fallback"})
-                else:
-                    print("Returning stored recomendations")
-                    return jsonify({"recommend_movies": stored_recs, "status": "stored recommendations"})
-            except:
-                return jsonify({"error": "Failed to generate recommendations"}), 500
+        stored_payload = get_stored_recommendations_payload(user_id)
+        has_stored_recs = stored_payload != "[]"
+
+        # A first run needs preferences, tell the client straight away instead of failing in the job
+        if not has_stored_recs and not get_user_preferences(current_user):
+            return jsonify({"error": "User preferences not found"}), 404
+
+        job = enqueue_recommendation_job(user_id, current_user)
+
+        if job["status"] == "failed":
+            # The last refresh failed recently, serve what we have rather than retrying on every poll
+            if has_stored_recs:
+                return recommendations_response(stored_payload, status="stored recommendations", job=job_response(job))
+            fallback_recs = get_fallback_recommendations(get_user_preferences(current_user))
+            print("Returning fallback recommendations")
+            return jsonify({"recommended_movies": fallback_recs, "status": "fallback", "job": job_response(job)})
+
+        # Stored recommendations (if any) are served now, the client polls until the refresh is done
+        return recommendations_response(stored_payload, status="generating", job=job_response(job))
     except Exception as e:
-        # If we have a user_id, make sure to release any lock
-        if user_id:
-            release_lock(user_id)
         print(f"Error in recommend_movies: {e}")
         return jsonify({"error": "An error occurred gathering recommendations"}), 500
 
+@recommendations_bp.route("/recommendation-jobs", methods=["POST"])
+@token_required
+def create_recommendation_job(current_user):
+    """ Queue a recommendation refresh now, whether or not the stored ones are out of date """
+    user_id = get_user_id(current_user)
+    if not user_id:
+        return jsonify({"error": "User not found"}), 404
+
+    job = enqueue_recommendation_job(user_id, current_user)
+    return jsonify({"job": job_response(job)}), 202
+
+@recommendations_bp.route("/recommendation-jobs/latest", methods=["GET"])
+@token_required
+def get_latest_recommendation_job(current_user):
+    """ Get the status of the user's most recent recommendation job """
+    user_id = get_user_id(current_user)
+    if not user_id:
+        return jsonify({"error": "User not found"}), 404
+
+    job = job_queue.latest(f"recommendations:{user_id}")
+    if not job:
+        return jsonify({"error": "No recommendation job found"}), 404
+    return jsonify({"job": job_response(job)})
+
+@recommendations_bp.route("/recommendation-jobs/<job_id>", methods=["GET"])
+@token_required
+def get_recommendation_job(current_user, job_id):
+    """ Get the status of a recommendation job """
+    user_id = get_user_id(current_user)
+    job = job_queue.get(job_id)
+
+    # Other users' jobs are reported as missing
+    if not job or not user_id or job.get("owner") != user_id:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job": job_response(job)})
+
 @recommendations_bp.route("/recommendation-explanations", methods=["GET"])
 @token_required
 def get_recommendation_explanations(current_user):
@@ -1283,6 +1224,7 @@ def save_recommendation_feedback(current_user):
             """, (user_id,))
         
         connection.commit()
+        invalidate_stored_recommendations(user_id)
         return jsonify({"success": "Feedback saved successfully"}), 200       
     except Exception as e:
         connection.rollback()
@@ -1324,7 +1266,7 @@ def get_disliked_recommendations(current_user):
         for movie in disliked_movies:
             try:
                 # Parse genres from string
-                genres = ast.literal_eval(movie['genres']) if movie['genres'] else []
+                genres = parse_list_from_db(movie['genres'])
             except:
                 genres = []
                 
@@ -1365,25 +1307,24 @@ def exclude_disliked_movies(user_id, candidate_movies):
         disliked_genres = set()
         disliked_actors = set()
         
-        # For each disliked movie, get its details
-        for movie_id in disliked_movie_ids:
-            cursor.execute("""
-                SELECT genres, actors 
-                FROM user_recommendations 
-                WHERE user_id = %s AND movie_id = %s
-            """, (user_id, movie_id))
-            
-            movie = cursor.fetchone()
-            if movie:
-                try:
-                    # Parse genres and actors from strings
-                    genres = ast.literal_eval(movie['genres']) if movie['genres'] else []
-                    actors = ast.literal_eval(movie['actors']) if movie['actors'] else []
-                    
-                    disliked_genres.update(genres)
-                    disliked_actors.update(actors)
-                except:
-                    pass
+        # Get every disliked movie's details in one query
+        placeholders = ', '.join(['%s'] * len(disliked_movie_ids))
+        cursor.execute(f"""
+            SELECT genres, actors 
+            FROM user_recommendations 
+            WHERE user_id = %s AND movie_id IN ({placeholders})
+        """, (user_id, *disliked_movie_ids))
+        
+        for movie in cursor.fetchall():
+            try:
+                # Parse genres and actors from strings
+                genres = parse_list_from_db(movie['genres'])
+                actors = parse_list_from_db(movie['actors'])
+                
+                disliked_genres.update(genres)
+                disliked_actors.update(actors)
+            except:
+                pass
         
         # Filter candidate movies
         filtered_candidates = []
@@ -1446,6 +1387,7 @@ def refresh_recommendations(current_user):
         """, (user_id,))
         
         connection.commit()
+        invalidate_stored_recommendations(user_id)
         
         return jsonify({"success": "Recommendations will be refreshed on next request"}), 200
     except Exception as e:
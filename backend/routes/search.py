@@ -1,12 +1,11 @@
 from flask import Blueprint, jsonify, request
 from utils.auth_utils import token_required
-from utils.movie_utils import fetch_genre_mapping, get_actors
-import requests
+from utils.movie_utils import fetch_genre_mapping, fetch_movie_bundles, extract_actors
+from utils.tmdb_client import tmdb_client
 from config import get_config
 
 search_bp = Blueprint('search', __name__)
 config = get_config()
-TMDB_KEY = config.TMDB_API_KEY
 
 @search_bp.route("/search", methods=["GET"])
 @token_required
@@ -17,10 +16,13 @@ def search_movies(current_user):
     if not query:
         return jsonify({"error": "Search query is too short"}), 400
     
-    search_url = f"https://api.themoviedb.org/3/search/movie?api_key={TMDB_KEY}&language=en-US&query={query}&page=1&include_adult=false"
-
     try:
-        response = requests.get(search_url)
+        response = tmdb_client.get("/search/movie", params={
+            "language": "en-US",
+            "query": query,
+            "page": 1,
+            "include_adult": "false"
+        })
         if response.status_code == 200:
             data = response.json()
             results = data.get("results", [])
@@ -28,6 +30,9 @@ def search_movies(current_user):
             # Get the names of the genres     
             genre_mapping = fetch_genre_mapping()
 
+            # Get the credits of every result at once
+            bundles = fetch_movie_bundles([movie["id"] for movie in results])
+
             for movie in results:
                 genre_ids = movie.get("genre_ids", [])
                 movie_genre = []
@@ -40,7 +45,8 @@ def search_movies(current_user):
                 movie.pop("genre_ids", None)
 
                 # Get actors of each movie 
-                movie["actors"] = get_actors(movie["id"])
+                bundle = bundles.get(int(movie["id"]))
+                movie["actors"] = extract_actors(bundle.get("credits", {})) if bundle else []
             
             return jsonify({"results": results}), 200
         else:
@@ -1,15 +1,110 @@
 from flask import Blueprint, jsonify, request
 from database import get_db_connection
 from utils.auth_utils import token_required
-from utils.movie_utils import fetch_movie, parse_list_from_db, get_actors
-import ast
+from utils.movie_utils import fetch_movie_bundles, extract_actors, parse_list_from_db
+from utils.movie_catalog import is_catalog_row_fresh
+from datetime import datetime
+from config import get_config
+import base64
+import json
 
 watchlist_bp = Blueprint('watchlist', __name__)
+config = get_config()
+
+# Values of the user_watchlist.status enum
+WATCHLIST_STATUSES = ('want_to_watch', 'watching', 'watched')
+
+def apply_movie_info(item, movie_info):
+    """ Copy TMDB movie details onto a watchlist item """
+    item['movie_title'] = movie_info.get('title', '')
+    item['poster_path'] = movie_info.get('poster_path', '')
+    item['overview'] = movie_info.get('overview', '')
+    item['genres'] = [genre["name"] for genre in movie_info.get("genres", [])]
+    item['release_date'] = movie_info.get('release_date', '')
+    item['vote_average'] = movie_info.get('vote_average', 0)
+
+def build_watchlist_items(rows):
+    """ Turn joined watchlist rows into items, fetching details concurrently for movies with no local copy """
+    items = []
+    missing = {}
+    seen_ids = set()
+
+    for row in rows:
+        # A movie stored twice in the recommendations would repeat the watchlist row
+        if row['id'] in seen_ids:
+            continue
+        seen_ids.add(row['id'])
+
+        item = {key: row[key] for key in ('id', 'movie_id', 'status', 'date_added', 'user_rating', 'notes')}
+        items.append(item)
+
+        # Look at the stored recommendations first, then the movie catalog (prevents unnecessary API calls)
+        if row['rec_movie_id'] is not None:
+            item['movie_title'] = row['rec_title']
+            item['poster_path'] = row['rec_poster_path']
+            item['overview'] = row['rec_overview']
+            
+            # Parse genres from string to list
+            try:
+                item['genres'] = parse_list_from_db(row['rec_genres'])
+            except Exception:
+                item['genres'] = []
+                
+            item['release_date'] = row['rec_release_date']
+            item['vote_average'] = row['rec_vote_average']
+        elif row['catalog_details'] and is_catalog_row_fresh({'last_fetched': row['catalog_last_fetched']}):
+            try:
+                apply_movie_info(item, json.loads(row['catalog_details']))
+            except (TypeError, ValueError):
+                missing.setdefault(item['movie_id'], []).append(item)
+        else:
+            missing.setdefault(item['movie_id'], []).append(item)
+
+    # If not stored locally then fetch every missing movie from TMDB at once
+    if missing:
+        bundles = fetch_movie_bundles(list(missing))
+        for movie_id, movie_items in missing.items():
+            movie_info = bundles.get(int(movie_id))
+            if movie_info:
+                for item in movie_items:
+                    apply_movie_info(item, movie_info)
+
+    return items
+
+def encode_watchlist_cursor(item):
+    """ Opaque cursor pointing just after a watchlist item in (date_added, id) order """
+    date_added = item['date_added'].isoformat() if item['date_added'] else None
+    return base64.urlsafe_b64encode(json.dumps([date_added, item['id']]).encode()).decode()
+
+def decode_watchlist_cursor(cursor_value):
+    """ Get (date_added, id) back from a cursor, raising ValueError if it is malformed """
+    try:
+        date_added, item_id = json.loads(base64.urlsafe_b64decode(cursor_value.encode()))
+        return (datetime.fromisoformat(date_added) if date_added else None), int(item_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
 
 @watchlist_bp.route("/watchlist", methods=["GET"])
 @token_required
 def get_watchlist(current_user):
-    """Get the user's watchlist """
+    """Get the user's watchlist, a page at a time when a limit or cursor is given """
+    status = request.args.get("status")
+    cursor_value = request.args.get("cursor")
+    limit = request.args.get("limit")
+    paginate = limit is not None or cursor_value is not None
+
+    # Check the paging parameters before touching the database
+    if status and status not in WATCHLIST_STATUSES:
+        return jsonify({"error": f"Status must be one of {', '.join(WATCHLIST_STATUSES)}"}), 400
+    if paginate:
+        try:
+            limit = int(limit) if limit is not None else config.WATCHLIST_PAGE_SIZE
+            after = decode_watchlist_cursor(cursor_value) if cursor_value else None
+        except ValueError:
+            return jsonify({"error": "Invalid limit or cursor"}), 400
+        if limit < 1 or limit > config.WATCHLIST_MAX_PAGE_SIZE:
+            return jsonify({"error": f"Limit must be between 1 and {config.WATCHLIST_MAX_PAGE_SIZE}"}), 400
+
     connection = get_db_connection()
     cursor = connection.cursor(dictionary=True) 
 
@@ -23,55 +118,65 @@ def get_watchlist(current_user):
         
         user_id = user_result['id']
 
-        # Get watchlist data
-        cursor.execute("""
-            SELECT id, movie_id, status, date_added, user_rating, notes
-            FROM user_watchlist
-            WHERE user_id = %s
-            ORDER BY date_added DESC
-        """, (user_id,))
+        # Select the items (a page of them if paginating) on the (user_id, date_added, id) index
+        conditions = ["user_id = %s"]
+        params = [user_id]
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
 
-        watchlist_items = cursor.fetchall()
-        
-        # Fetch movie details for each watchlist item
-        for item in watchlist_items:
-            # Look at the stored recommendations (prevents unnecessary API calls)
-            cursor.execute("""
-                SELECT movie_title, poster_path, overview, genres, release_date, vote_average
-                FROM user_recommendations 
-                WHERE movie_id = %s AND user_id = %s
-            """, (item['movie_id'], user_id))
-            
-            movie_details = cursor.fetchone()
-            
-            # If not in recommendations then fetch from TMDB API
-            if not movie_details:
-                movie_info = fetch_movie(item['movie_id'])
-                if movie_info:
-                    item['movie_title'] = movie_info.get('title', '')
-                    item['poster_path'] = movie_info.get('poster_path', '')
-                    item['overview'] = movie_info.get('overview', '')
-                    item['genres'] = [genre["name"] for genre in movie_info.get("genres", [])]
-                    item['release_date'] = movie_info.get('release_date', '')
-                    item['vote_average'] = movie_info.get('vote_average', 0)
-            else:
-                item['movie_title'] = movie_details['movie_title']
-                item['poster_path'] = movie_details['poster_path']
-                item['overview'] = movie_details['overview']
-                
-                # Parse genres from string to list
-                try:
-                    if movie_details['genres']:
-                        item['genres'] = parse_list_from_db(movie_details['genres'])
-                    else:
-                        item['genres'] = []
-                except Exception:
-                    item['genres'] = []
-                    
-                item['release_date'] = movie_details['release_date']
-                item['vote_average'] = movie_details['vote_average']
-                
-        return jsonify({"watchlist": watchlist_items})
+        page_clause = ""
+        if paginate:
+            if after:
+                after_date, after_id = after
+                if after_date is None:
+                    # Items without a date sort last
+                    conditions.append("(date_added IS NULL AND id < %s)")
+                    params.append(after_id)
+                else:
+                    conditions.append("(date_added < %s OR (date_added = %s AND id < %s) OR date_added IS NULL)")
+                    params.extend([after_date, after_date, after_id])
+            # One extra row tells us if there is another page
+            page_clause = "LIMIT %s"
+            params.append(limit + 1)
+
+        # Get watchlist data with any stored recommendation and catalog details in one query
+        cursor.execute(f"""
+            SELECT 
+                w.id, w.movie_id, w.status, w.date_added, w.user_rating, w.notes,
+                r.movie_id AS rec_movie_id, r.movie_title AS rec_title, r.poster_path AS rec_poster_path,
+                r.overview AS rec_overview, r.genres AS rec_genres, r.release_date AS rec_release_date,
+                r.vote_average AS rec_vote_average,
+                c.details AS catalog_details, c.last_fetched AS catalog_last_fetched
+            FROM (
+                SELECT id, user_id, movie_id, status, date_added, user_rating, notes
+                FROM user_watchlist
+                WHERE {' AND '.join(conditions)}
+                ORDER BY date_added DESC, id DESC
+                {page_clause}
+            ) w
+            LEFT JOIN user_recommendations r ON r.user_id = w.user_id AND r.movie_id = w.movie_id
+            LEFT JOIN movie_catalog c ON c.movie_id = w.movie_id
+            ORDER BY w.date_added DESC, w.id DESC
+        """, tuple(params))
+        rows = cursor.fetchall()
+
+        if not paginate:
+            return jsonify({"watchlist": build_watchlist_items(rows)})
+
+        # Only the returned page is enriched
+        page_ids = []
+        for row in rows:
+            if row['id'] not in page_ids:
+                page_ids.append(row['id'])
+        has_more = len(page_ids) > limit
+        page_ids = set(page_ids[:limit])
+        watchlist_items = build_watchlist_items([row for row in rows if row['id'] in page_ids])
+
+        return jsonify({
+            "watchlist": watchlist_items,
+            "next_cursor": encode_watchlist_cursor(watchlist_items[-1]) if has_more else None
+        })
     except Exception as e:
         print(f"An error occurred when fetching the watchlist: {str(e)}")
         return jsonify({"error": "Failed to fetch watchlist"}), 500
@@ -276,25 +381,23 @@ def get_user_watchlist_preferences(user_id):
                 except:
                     continue
             
-            # For movies not found in recommendations, fetch from TMDB API
+            # For movies not found in recommendations, read the movie catalog (TMDB only for misses)
             missing_movie_ids = [id for id in liked_movie_ids if id not in found_movie_ids]
             
-            for movie_id in missing_movie_ids:
-                try:
-                    # Fetch movie details from TMDB API
-                    movie_info = fetch_movie(movie_id)
-                    if movie_info:
-                        # Extract and add genres
-                        if 'genres' in movie_info:
-                            for genre in movie_info['genres']:
-                                liked_genres.add(genre['name'])
-                        
-                        # Fetch and add actors
-                        actors = get_actors(movie_id)
-                        liked_actors.update(actors)
-                except Exception as e:
-                    print(f"Error fetching data for movie {movie_id}: {e}")
-                    continue
+            try:
+                missing_movies = fetch_movie_bundles(missing_movie_ids) if missing_movie_ids else {}
+            except Exception as e:
+                print(f"Error fetching data for liked movies: {e}")
+                missing_movies = {}
+
+            for movie_id, movie_info in missing_movies.items():
+                # Extract and add genres
+                if 'genres' in movie_info:
+                    for genre in movie_info['genres']:
+                        liked_genres.add(genre['name'])
+                
+                # Extract and add actors
+                liked_actors.update(extract_actors(movie_info.get('credits', {})))
         
         return {
             'all_watchlist_items': all_watchlist_items,
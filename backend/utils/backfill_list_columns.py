@@ -0,0 +1,70 @@
+import json
+from database import get_db_connection
+from utils.movie_utils import parse_list_from_db, encode_list_for_db
+
+# List columns that used to be written with str(list), by table
+LIST_COLUMNS = {
+    "questionnaire": ("favourite_movies", "genres", "favourite_actors"),
+    "user_recommendations": ("genres", "actors")
+}
+
+def is_json_list(value):
+    """ Check if a stored value is already a JSON list """
+    if value is None:
+        return True
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    try:
+        return isinstance(json.loads(value), list)
+    except (TypeError, ValueError):
+        return False
+
+def backfill_table(table, columns, batch_size=500):
+    """ Rewrite a table's Python list literals as JSON, a batch of rows at a time, returning how many rows changed """
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+    updated = 0
+    last_id = 0
+
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT id, {', '.join(columns)} FROM {table}
+                WHERE id > %s ORDER BY id LIMIT %s
+            """, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            # Only rows with at least one legacy value are rewritten
+            updates = [
+                tuple(encode_list_for_db(parse_list_from_db(row[column])) for column in columns) + (row['id'],)
+                for row in rows if not all(is_json_list(row[column]) for column in columns)
+            ]
+            if updates:
+                cursor.executemany(f"""
+                    UPDATE {table} SET {', '.join(f'{column} = %s' for column in columns)}
+                    WHERE id = %s
+                """, updates)
+                connection.commit()
+                updated += len(updates)
+
+        return updated
+    except Exception as e:
+        connection.rollback()
+        print(f"Error backfilling {table}: {e}")
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+def backfill_list_columns(batch_size=500):
+    """ Convert every stored list column to JSON """
+    for table, columns in LIST_COLUMNS.items():
+        updated = backfill_table(table, columns, batch_size=batch_size)
+        print(f"Converted {updated} {table} rows to JSON lists")
+
+if __name__ == "__main__":
+    # Run from backend/ with: python -m utils.backfill_list_columns
+    backfill_list_columns()
@@ -0,0 +1,508 @@
+import os
+import sys
+import time
+import pickle
+import socket
+import sqlite3
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+def estimate_size(data):
+  """ Approximate how many bytes a cached value takes up """
+  try:
+    return len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+  except Exception:
+    return sys.getsizeof(data)
+
+class CacheBackend:
+  """ Interface every cache backend implements """
+
+  name = "base"
+
+  def __init__(self):
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key):
+    """ Get a value if it exists and has not expired """
+    raise NotImplementedError
+
+  def set(self, key, data, ttl=3600):
+    """ Store a value for ttl seconds """
+    raise NotImplementedError
+
+  def add(self, key, data, ttl=3600):
+    """ Store a value only if the key is absent, returns True if it was stored """
+    raise NotImplementedError
+
+  def delete(self, key):
+    """ Remove a value """
+    raise NotImplementedError
+
+  def clear(self):
+    """ Remove every value """
+    raise NotImplementedError
+
+  def stats(self):
+    """ Get counters for monitoring (counted per worker process) """
+    return {"backend": self.name, "hits": self.hits, "misses": self.misses}
+
+class MemoryCacheBackend(CacheBackend):
+  """ Bounded in-process LRU cache with expiry times and approximate memory accounting """
+
+  name = "memory"
+
+  def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, sweep_interval=60):
+    super().__init__()
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.sweep_interval = sweep_interval
+
+    # key -> (expiry, data, size), ordered from least to most recently used
+    self._entries = OrderedDict()
+    self._lock = threading.RLock()
+    self._current_bytes = 0
+    self._sweeper = None
+
+    self.evictions = 0
+    self.expirations = 0
+
+  def get(self, key):
+    """ Get a value if it exists and has not expired """
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+
+      expiry, data, size = entry
+      if expiry <= time.time():
+        self._remove(key)
+        self.expirations += 1
+        self.misses += 1
+        return None
+
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return data
+
+  def set(self, key, data, ttl=3600):
+    """ Store a value and evict least recently used entries if over budget """
+    size = estimate_size(data)
+
+    # Values bigger than the whole budget are never cached
+    if self.max_bytes and size > self.max_bytes:
+      print(f"Cache value for {key} is {size} bytes, larger than the cache budget, skipping")
+      return
+
+    with self._lock:
+      if key in self._entries:
+        self._remove(key)
+
+      self._entries[key] = (time.time() + ttl, data, size)
+      self._current_bytes += size
+      self._evict()
+
+    self._start_sweeper()
+
+  def add(self, key, data, ttl=3600):
+    """ Store a value only if the key is absent or expired """
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and entry[0] > time.time():
+        return False
+      self.set(key, data, ttl)
+      return True
+
+  def delete(self, key):
+    """ Remove a value from the cache """
+    with self._lock:
+      if key in self._entries:
+        self._remove(key)
+
+  def clear(self):
+    """ Remove every value from the cache """
+    with self._lock:
+      self._entries.clear()
+      self._current_bytes = 0
+
+  def sweep(self):
+    """ Remove all expired entries """
+    now = time.time()
+    with self._lock:
+      expired_keys = [key for key, (expiry, data, size) in self._entries.items() if expiry <= now]
+      for key in expired_keys:
+        self._remove(key)
+      self.expirations += len(expired_keys)
+    return len(expired_keys)
+
+  def stats(self):
+    """ Get hit, miss, eviction and size counters """
+    with self._lock:
+      return {
+        "backend": self.name,
+        "entries": len(self._entries),
+        "bytes": self._current_bytes,
+        "max_entries": self.max_entries,
+        "max_bytes": self.max_bytes,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "expirations": self.expirations
+      }
+
+  def _remove(self, key):
+    expiry, data, size = self._entries.pop(key)
+    self._current_bytes -= size
+
+  def _evict(self):
+    while self._entries and (
+      (self.max_entries and len(self._entries) > self.max_entries) or
+      (self.max_bytes and self._current_bytes > self.max_bytes)
+    ):
+      key, (expiry, data, size) = self._entries.popitem(last=False)
+      self._current_bytes -= size
+      self.evictions += 1
+
+  def _start_sweeper(self):
+    """ Start the background thread that clears expired entries """
+    if self._sweeper is not None or not self.sweep_interval:
+      return
+
+    with self._lock:
+      if self._sweeper is not None:
+        return
+      self._sweeper = threading.Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+      self._sweeper.start()
+
+  def _sweep_loop(self):
+    while True:
+      time.sleep(self.sweep_interval)
+      try:
+        self.sweep()
+      except Exception as e:
+        print(f"Error sweeping cache: {e}")
+
+class SQLiteCacheBackend(CacheBackend):
+  """ On-disk cache shared by every worker process on the host """
+
+  name = "sqlite"
+
+  def __init__(self, path=None, max_entries=10000, sweep_interval=60):
+    super().__init__()
+    self.path = path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "suggestify_cache.sqlite3")
+    self.max_entries = max_entries
+    self.sweep_interval = sweep_interval
+    self._local = threading.local()
+    self._last_sweep = 0
+
+    self._prepare_file()
+    connection = self._connection()
+    connection.execute("""
+      CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        expiry REAL NOT NULL,
+        value BLOB NOT NULL
+      )
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expiry ON cache_entries (expiry)")
+    connection.commit()
+
+  def _prepare_file(self):
+    """ Create the cache file readable only by this user and refuse one someone else owns, values are unpickled """
+    directory = os.path.dirname(self.path)
+    if directory:
+      os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+      info = os.fstat(fd)
+      if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"Cache file {self.path} is owned by another user")
+      # Tighten a file this user created earlier with looser permissions
+      if info.st_mode & 0o077:
+        os.fchmod(fd, 0o600)
+    finally:
+      os.close(fd)
+
+  def _connection(self):
+    """ Get this thread's connection, sqlite connections can't be shared across threads """
+    connection = getattr(self._local, "connection", None)
+    if connection is None:
+      connection = sqlite3.connect(self.path, timeout=10)
+      # WAL lets readers in other workers carry on while one worker writes
+      connection.execute("PRAGMA journal_mode=WAL")
+      connection.execute("PRAGMA synchronous=NORMAL")
+      self._local.connection = connection
+    return connection
+
+  def _rollback(self):
+    """ Drop whatever the failed statement left open so the next one starts clean """
+    try:
+      self._connection().rollback()
+    except sqlite3.Error:
+      pass
+
+  def get(self, key):
+    """ Get a value if it exists and has not expired """
+    try:
+      row = self._connection().execute(
+        "SELECT expiry, value FROM cache_entries WHERE key = ?", (key,)
+      ).fetchone()
+      value = pickle.loads(row[1]) if row is not None and row[0] > time.time() else None
+    except Exception as e:
+      # A locked database or corrupt value is treated as a miss
+      print(f"Error reading cache key {key}: {e}")
+      value = None
+
+    if value is None:
+      self.misses += 1
+      return None
+
+    self.hits += 1
+    return value
+
+  def set(self, key, data, ttl=3600):
+    """ Store a value for ttl seconds """
+    try:
+      connection = self._connection()
+      connection.execute(
+        "INSERT OR REPLACE INTO cache_entries (key, expiry, value) VALUES (?, ?, ?)",
+        (key, time.time() + ttl, sqlite3.Binary(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)))
+      )
+      connection.commit()
+    except Exception as e:
+      self._rollback()
+      print(f"Error writing cache key {key}: {e}")
+      return
+
+    if time.time() - self._last_sweep > self.sweep_interval:
+      self.sweep()
+
+  def add(self, key, data, ttl=3600):
+    """ Store a value only if the key is absent or expired, atomic across workers """
+    now = time.time()
+    try:
+      connection = self._connection()
+      connection.execute("DELETE FROM cache_entries WHERE key = ? AND expiry <= ?", (key, now))
+      inserted = connection.execute(
+        "INSERT OR IGNORE INTO cache_entries (key, expiry, value) VALUES (?, ?, ?)",
+        (key, now + ttl, sqlite3.Binary(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)))
+      ).rowcount
+      connection.commit()
+      return inserted == 1
+    except Exception as e:
+      self._rollback()
+      print(f"Error adding cache key {key}: {e}")
+      return False
+
+  def delete(self, key):
+    """ Remove a value """
+    try:
+      connection = self._connection()
+      connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+      connection.commit()
+    except Exception as e:
+      self._rollback()
+      print(f"Error deleting cache key {key}: {e}")
+
+  def clear(self):
+    """ Remove every value """
+    connection = self._connection()
+    connection.execute("DELETE FROM cache_entries")
+    connection.commit()
+
+  def sweep(self):
+    """ Remove expired entries and trim the table to max_entries (soonest to expire go first) """
+    self._last_sweep = time.time()
+    try:
+      connection = self._connection()
+      removed = connection.execute("DELETE FROM cache_entries WHERE expiry <= ?", (time.time(),)).rowcount
+
+      if self.max_entries:
+        removed += connection.execute("""
+          DELETE FROM cache_entries WHERE key IN (
+            SELECT key FROM cache_entries ORDER BY expiry DESC LIMIT -1 OFFSET ?
+          )
+        """, (self.max_entries,)).rowcount
+      connection.commit()
+      return removed
+    except Exception as e:
+      # Another worker will sweep, or this one will on its next interval
+      self._rollback()
+      print(f"Error sweeping cache: {e}")
+      return 0
+
+  def stats(self):
+    """ Get hit, miss and size counters """
+    entries = self._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+    return {
+      "backend": self.name,
+      "path": self.path,
+      "entries": entries,
+      "max_entries": self.max_entries,
+      "hits": self.hits,
+      "misses": self.misses
+    }
+
+class RedisProtocolError(Exception):
+  """ Raised when a Redis-protocol server returns an error reply """
+
+class RedisCacheBackend(CacheBackend):
+  """ Cache stored in a local Redis-protocol server (Redis, Valkey, KeyDB, ...) over RESP """
+
+  name = "redis"
+
+  def __init__(self, url="redis://localhost:6379/0", timeout=2.0, prefix="suggestify:"):
+    super().__init__()
+    parsed = urlparse(url)
+    self.host = parsed.hostname or "localhost"
+    self.port = parsed.port or 6379
+    self.password = parsed.password
+    self.db = int(parsed.path.lstrip("/") or 0)
+    self.timeout = timeout
+    self.prefix = prefix
+    self._local = threading.local()
+
+    # Fail fast so a missing server is noticed when the backend is created
+    self._command("PING")
+
+  def _connect(self):
+    sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+    self._local.sock = sock
+    self._local.reader = sock.makefile("rb")
+
+    if self.password:
+      self._send("AUTH", self.password)
+    if self.db:
+      self._send("SELECT", self.db)
+
+  def _send(self, *args):
+    """ Send one command and read its reply on this thread's connection """
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+      if not isinstance(arg, bytes):
+        arg = str(arg).encode()
+      parts.append(f"${len(arg)}\r\n".encode() + arg + b"\r\n")
+    self._local.sock.sendall(b"".join(parts))
+    return self._read_reply()
+
+  def _read_reply(self):
+    line = self._local.reader.readline()
+    if not line:
+      raise ConnectionError("Connection closed by cache server")
+
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+      return payload.decode()
+    if prefix == b"-":
+      raise RedisProtocolError(payload.decode())
+    if prefix == b":":
+      return int(payload)
+    if prefix == b"$":
+      length = int(payload)
+      if length == -1:
+        return None
+      data = self._local.reader.read(length + 2)
+      return data[:-2]
+    if prefix == b"*":
+      count = int(payload)
+      if count == -1:
+        return None
+      return [self._read_reply() for _ in range(count)]
+    raise RedisProtocolError(f"Unknown reply type {prefix!r}")
+
+  def _command(self, *args):
+    """ Run a command, reconnecting once if the connection dropped """
+    for attempt in range(2):
+      try:
+        if getattr(self._local, "sock", None) is None:
+          self._connect()
+        return self._send(*args)
+      except (ConnectionError, OSError):
+        self._close()
+        if attempt == 1:
+          raise
+
+  def _close(self):
+    sock = getattr(self._local, "sock", None)
+    if sock is not None:
+      try:
+        sock.close()
+      except OSError:
+        pass
+    self._local.sock = None
+
+  def get(self, key):
+    """ Get a value if it exists and has not expired """
+    try:
+      value = self._command("GET", self.prefix + key)
+    except Exception as e:
+      print(f"Error reading cache key {key}: {e}")
+      value = None
+
+    if value is None:
+      self.misses += 1
+      return None
+
+    self.hits += 1
+    return pickle.loads(value)
+
+  def set(self, key, data, ttl=3600):
+    """ Store a value for ttl seconds """
+    try:
+      self._command("SET", self.prefix + key, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), "PX", max(int(ttl * 1000), 1))
+    except Exception as e:
+      print(f"Error writing cache key {key}: {e}")
+
+  def add(self, key, data, ttl=3600):
+    """ Store a value only if the key is absent, atomic across workers """
+    try:
+      reply = self._command("SET", self.prefix + key, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), "NX", "PX", max(int(ttl * 1000), 1))
+      return reply == "OK"
+    except Exception as e:
+      print(f"Error adding cache key {key}: {e}")
+      return False
+
+  def delete(self, key):
+    """ Remove a value """
+    try:
+      self._command("DEL", self.prefix + key)
+    except Exception as e:
+      print(f"Error deleting cache key {key}: {e}")
+
+  def clear(self):
+    """ Remove every value under this backend's prefix """
+    cursor = "0"
+    while True:
+      cursor, keys = self._command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+      cursor = cursor.decode() if isinstance(cursor, bytes) else cursor
+      if keys:
+        self._command("DEL", *keys)
+      if cursor == "0":
+        break
+
+def create_cache_backend(config):
+  """ Build the cache backend selected by CACHE_BACKEND, falling back to memory """
+  backend_name = (config.CACHE_BACKEND or "memory").lower()
+
+  try:
+    if backend_name == "sqlite":
+      return SQLiteCacheBackend(
+        path=config.CACHE_SQLITE_PATH,
+        max_entries=config.CACHE_MAX_ENTRIES,
+        sweep_interval=config.CACHE_SWEEP_INTERVAL
+      )
+    if backend_name == "redis":
+      return RedisCacheBackend(url=config.CACHE_REDIS_URL)
+    if backend_name != "memory":
+      print(f"Unknown cache backend '{backend_name}', using memory")
+  except Exception as e:
+    print(f"Could not start {backend_name} cache backend ({e}), using memory")
+
+  return MemoryCacheBackend(
+    max_entries=config.CACHE_MAX_ENTRIES,
+    max_bytes=config.CACHE_MAX_BYTES,
+    sweep_interval=config.CACHE_SWEEP_INTERVAL
+  )
@@ -1,38 +1,199 @@
 import time
+import threading
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from config import get_config
+from utils.cache_backends import create_cache_backend
 
-_cache = {}
+config = get_config()
+
+# Backend is chosen by CACHE_BACKEND (memory, sqlite or redis)
+_cache = create_cache_backend(config)
+
+# Per-key locks (and how many threads are using each) so only one thread in this worker recomputes a key at a time
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+# Keys currently being refreshed in the background
+_refreshing = set()
+_refreshing_guard = threading.Lock()
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+def _lease_key(key):
+  return f"lease:{key}"
+
+def _get_entry(key):
+  """ Get (fresh_until, data) for a key, the entry is kept for CACHE_STALE_TTL past fresh_until """
+  entry = _cache.get(key)
+  if isinstance(entry, tuple) and len(entry) == 2:
+    return entry
+  return None
+
+def _set_entry(key, data, ttl):
+  # Entries outlive their TTL by the stale window so waiters can be served the old value
+  _cache.set(key, (time.time() + ttl, data), ttl + config.CACHE_STALE_TTL)
+
+def _checkout_key_lock(key):
+  with _key_locks_guard:
+    holder = _key_locks.get(key)
+    if holder is None:
+      holder = _key_locks[key] = [threading.Lock(), 0]
+    holder[1] += 1
+    return holder[0]
+
+def _return_key_lock(key):
+  with _key_locks_guard:
+    holder = _key_locks[key]
+    holder[1] -= 1
+    # Drop the lock once no thread is using it so the dict doesn't grow with every key
+    if holder[1] == 0:
+      del _key_locks[key]
+
+def _acquire_lease(key):
+  """ Claim the right to recompute a key across every worker sharing the backend """
+  return _cache.add(_lease_key(key), True, config.CACHE_LOCK_TIMEOUT)
+
+def _release_lease(key):
+  _cache.delete(_lease_key(key))
+
+def _compute_and_store(key, compute, ttl):
+  result = compute()
+  # Empty results are not cached, the next caller tries again
+  if result:
+    _set_entry(key, result, ttl)
+  return result
+
+def _wait_for_other_worker(key):
+  """ Wait for the worker holding the lease to store a fresh value """
+  deadline = time.time() + config.CACHE_LOCK_TIMEOUT
+  while time.time() < deadline:
+    time.sleep(0.25)
+    entry = _get_entry(key)
+    if entry and entry[0] > time.time():
+      return entry
+    if _cache.get(_lease_key(key)) is None:
+      return None
+  return None
+
+def _refresh_in_background(key, compute, ttl):
+  """ Recompute a key before it expires, without blocking the caller """
+  with _refreshing_guard:
+    if key in _refreshing:
+      return
+    _refreshing.add(key)
+
+  def refresh():
+    try:
+      if _acquire_lease(key):
+        try:
+          _compute_and_store(key, compute, ttl)
+        finally:
+          _release_lease(key)
+    except Exception as e:
+      print(f"Error refreshing cache key {key}: {e}")
+    finally:
+      with _refreshing_guard:
+        _refreshing.discard(key)
+
+  _refresh_executor.submit(refresh)
 
 def get_cached_data(key):
   """ Get data from cache if it exists """
-  if key in _cache:
-    expiry, data = _cache[key]
-    if expiry > time.time():
-      return data
-    else:
-      del _cache[key]
-    return None
-  
+  entry = _get_entry(key)
+  if entry and entry[0] > time.time():
+    return entry[1]
+  return None
+
 def set_cached_data(key, data, ttl=3600):
   """ Store data in cache with expriation time """
-  expiry = time.time() + ttl
-  _cache[key] = (expiry, data)
+  _set_entry(key, data, ttl)
+
+def delete_cached_data(key):
+  """ Remove data from cache """
+  _cache.delete(key)
+
+def get_or_compute_cached_data(key, compute, ttl=3600, refresh_ahead=False):
+  """ Get data from cache, making sure only one caller recomputes it when it is missing or expired """
+  entry = _get_entry(key)
+  now = time.time()
+
+  # Fresh hit, optionally recompute in the background when close to expiry
+  if entry and entry[0] > now:
+    if refresh_ahead and entry[0] - now < ttl * config.CACHE_REFRESH_AHEAD_RATIO:
+      _refresh_in_background(key, compute, ttl)
+    return entry[1]
+
+  lock = _checkout_key_lock(key)
+  try:
+    # Expired but still inside the stale window: one caller recomputes, everyone else gets the old value
+    if entry:
+      if not lock.acquire(blocking=False):
+        return entry[1]
+      try:
+        return _refresh_stale(key, compute, ttl, entry[1])
+      finally:
+        lock.release()
+
+    # Nothing cached: wait for whoever is already computing it rather than starting another fan-out
+    with lock:
+      return _compute_missing(key, compute, ttl)
+  finally:
+    _return_key_lock(key)
+
+def _refresh_stale(key, compute, ttl, stale_data):
+  """ Recompute an expired key, falling back to the stale value if another worker has it or it fails """
+  if not _acquire_lease(key):
+    return stale_data
+  try:
+    return _compute_and_store(key, compute, ttl) or stale_data
+  except Exception as e:
+    print(f"Error recomputing cache key {key}, serving stale value: {e}")
+    return stale_data
+  finally:
+    _release_lease(key)
+
+def _compute_missing(key, compute, ttl):
+  """ Compute a key with nothing cached, called while holding the key's lock """
+  entry = _get_entry(key)
+  if entry and entry[0] > time.time():
+    return entry[1]
+
+  if not _acquire_lease(key):
+    entry = _wait_for_other_worker(key)
+    if entry:
+      return entry[1]
+    # The other worker failed or timed out, compute it here rather than fail the request
+    return _compute_and_store(key, compute, ttl)
+
+  try:
+    return _compute_and_store(key, compute, ttl)
+  finally:
+    _release_lease(key)
+
+def is_shared_cache():
+  """ Check if cached values are shared by every worker (sqlite or redis) rather than per process """
+  return _cache.name != "memory"
+
+def get_cache_stats():
+  """ Get cache counters for monitoring """
+  try:
+    stats = _cache.stats()
+  except Exception as e:
+    # A shared backend that can't be read right now still reports this worker's counters
+    print(f"Error reading cache stats: {e}")
+    stats = {"backend": _cache.name, "hits": _cache.hits, "misses": _cache.misses}
+  with _refreshing_guard:
+    stats["refreshing"] = len(_refreshing)
+  return stats
 
-def cache_decorator(ttl=3600):
+def cache_decorator(ttl=3600, refresh_ahead=False):
   def decorartor(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-      # Create cache key 
+      # Create cache key
       key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
 
-      # Check cache
-      cached_result = get_cached_data(key)
-      if cached_result:
-        return cached_result
-      
-      # Call function and cache result
-      result = func(*args, **kwargs)
-      set_cached_data(key, result, ttl)
-      return result 
+      # Check cache, recomputing once per key no matter how many callers miss together
+      return get_or_compute_cached_data(key, lambda: func(*args, **kwargs), ttl, refresh_ahead)
     return wrapper
-  return decorartor
\ No newline at end of file
+  return decorartor
@@ -0,0 +1,191 @@
+from utils.movie_utils import fetch_genre_mapping, get_actors, build_enhanced_movie_profile, parse_list_from_db
+from utils.cache_utils import get_or_compute_cached_data, delete_cached_data
+from database import get_db_connection
+from utils.tmdb_client import tmdb_client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+
+def candidate_cache_key(email):
+    return f"movie_data_{email}"
+
+def get_candidate_movies(email):
+    """ Get a user's candidate movies, shared by the /movies route and the recommendation pipeline """
+    # Uses caching to avoid repeated API calls, only one request rebuilds a user's movies at a time
+    # and hot entries are rebuilt in the background before they expire
+    return get_or_compute_cached_data(
+        candidate_cache_key(email),
+        lambda: build_movies_for_user(email),
+        ttl=3600, # cache for 1 hour
+        refresh_ahead=True
+    )
+
+def invalidate_candidate_movies(email):
+    """ Drop a user's cached candidates so the next request rebuilds them """
+    delete_cached_data(candidate_cache_key(email))
+
+def get_candidate_preferences(email):
+    """ Get the questionnaire answers candidate retrieval uses """
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+
+    cursor.execute("""
+        SELECT favourite_movies, genres, favourite_actors 
+        FROM questionnaire 
+        WHERE user_id = (SELECT id FROM users WHERE email = %s)
+    """, (email,))
+    user_data = cursor.fetchone()
+
+    cursor.close() 
+    connection.close()
+
+    return user_data
+
+def build_movies_for_user(current_user):
+    """Build the candidate movie list for a user, or None if they have no preferences."""
+    # genre mapping
+    genre_mapping = fetch_genre_mapping()
+
+    # Gets user prefernce from questionnaire form database 
+    user_preferences = get_candidate_preferences(current_user)
+    if not user_preferences:
+        return None
+    
+    favourite_genres = parse_list_from_db(user_preferences["genres"])
+    favourite_actors = parse_list_from_db(user_preferences["favourite_actors"])
+
+    print(f"User preferences loaded: genres={favourite_genres}, actors={favourite_actors}")
+
+    all_movies = [] 
+    movie_tasks = []
+
+    categories = {
+        "popular": "/movie/popular",
+        "top_rated": "/movie/top_rated",
+        "trending": "/trending/movie/week",
+        "now_playing": "/movie/now_playing",
+        "upcoming": "/movie/upcoming"
+    }   
+
+    # Auto-detect environment and adjust pages accordingly
+    from config import is_production
+    
+    if is_production():
+        pages_per_category = int(os.getenv('PAGES_PER_CATEGORY', '1'))
+    else:
+        pages_per_category = int(os.getenv('PAGES_PER_CATEGORY', '2'))
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        for category, path in categories.items():
+            for page in range(1, pages_per_category + 1):
+                movie_tasks.append(executor.submit(fetch_movie_data, path, page, favourite_genres, favourite_actors, genre_mapping))
+        
+        for future in as_completed(movie_tasks):
+            try:
+                movies = future.result()
+                if movies:
+                    all_movies.extend(movies)
+            except Exception as e:
+                print(f"Error occured when fecthing movies {e}")
+    
+    # Duplicate movies by ID
+    seen_ids = set()
+    unique_movies = []
+    for movie in all_movies:
+        if movie['id'] not in seen_ids:
+            seen_ids.add(movie['id'])
+            unique_movies.append(movie)
+
+    return unique_movies
+
+def fetch_movie_data(path, page, favourite_genres, favourite_actors, genre_mapping):
+    """Fetch movie data from TMDB API with better error handling."""
+    try:
+        response = tmdb_client.get(path, params={"language": "en-US", "page": page})
+        if response.status_code != 200:
+            print(f"Error: Status code {response.status_code} for TMDB API call")
+            return []
+        
+        data = response.json()
+        movies = data.get("results", [])
+        
+        if not movies:
+            print("No results found in the response")
+            return []
+            
+        processed_movies = []
+        
+        # Auto-detect environment and adjust features accordingly
+        from config import is_production
+        
+        if is_production():
+            ENABLE_ACTORS = os.getenv('ENABLE_ACTORS', 'false').lower() == 'true'
+            ENABLE_ENHANCED_PROFILES = os.getenv('ENABLE_ENHANCED_PROFILES', 'false').lower() == 'true'
+        else:
+            ENABLE_ACTORS = os.getenv('ENABLE_ACTORS', 'true').lower() == 'true'
+            ENABLE_ENHANCED_PROFILES = os.getenv('ENABLE_ENHANCED_PROFILES', 'true').lower() == 'true'
+        
+        for i, movie in enumerate(movies):
+            try:
+                if not isinstance(movie, dict):
+                    continue
+                
+                # Process genre info
+                movie_genres = []
+                genre_ids = movie.get("genre_ids", [])
+                if genre_ids:
+                    for genre_id in genre_ids:
+                        genre_name = genre_mapping.get(genre_id, "unknown")
+                        movie_genres.append(genre_name)
+                
+                movie_id = movie.get("id")
+                if not movie_id:
+                    continue
+                
+                # Get enhanced profile (configurable), the profile's single bundle request also carries the cast
+                if ENABLE_ENHANCED_PROFILES:
+                    actors = []
+                    try:
+                        profile_result = build_enhanced_movie_profile(movie_id)
+                        if profile_result:
+                            profile, enhanced_elements, details = profile_result
+                            if ENABLE_ACTORS:
+                                actors = enhanced_elements.get("actors", [])
+                            movie["genres"] = movie_genres
+                            movie["actors"] = actors
+                            movie["profile"] = profile
+                            movie["themes"] = enhanced_elements.get("themes", [])
+                            movie["tones"] = enhanced_elements.get("tones", [])
+                            movie["franchises"] = enhanced_elements.get("franchises", [])
+                            movie.pop("genre_ids", None)
+                            processed_movies.append(movie)
+                    except Exception as e:
+                        print(f"Error building profile for movie {movie_id}: {e}")
+                        # Fallback to basic info
+                        movie["genres"] = movie_genres
+                        movie["actors"] = actors
+                        movie.pop("genre_ids", None)
+                        processed_movies.append(movie)
+                else:
+                    # Basic processing only
+                    actors = fetch_actors_for_movie(movie_id) if ENABLE_ACTORS else []
+                    movie["genres"] = movie_genres
+                    movie["actors"] = actors
+                    movie.pop("genre_ids", None)
+                    processed_movies.append(movie)
+                    
+            except Exception as e:
+                print(f"Error processing movie {i}: {e}")
+                continue
+        print(f"Successfully processed {len(processed_movies)} out of {len(movies)} movies")     
+        return processed_movies
+    except Exception as e:
+        print(f"An error occurred in fetch_movie_data: {e}")
+        return []
+
+def fetch_actors_for_movie(movie_id):
+    """ Get a movie's actors without failing the whole page """
+    try:
+        return get_actors(movie_id)
+    except Exception as e:
+        print(f"Error getting actors for movie {movie_id}: {e}")
+        return []
@@ -0,0 +1,130 @@
+import numpy as np
+
+def movie_key(movie, position):
+    """ Identity used to track selected movies, the TMDB id when there is one """
+    movie_id = movie.get("id")
+    return movie_id if movie_id is not None else ("position", position)
+
+def genre_keys(movie, empty_as_unknown=True):
+    """ First two genres of a movie as strings, used for the genre caps """
+    movie_genres = movie.get("genres", ["Unknown"])
+    if not isinstance(movie_genres, list) or (empty_as_unknown and len(movie_genres) == 0):
+        movie_genres = ["Unknown"]
+    return [str(genre) for genre in movie_genres[:2]]
+
+def genre_cap_diversity(scored_movies, top_n=20, max_per_genre=5, guaranteed=5, high_score_ratio=0.8, **options):
+    """ Keep the top movies, then cap how many of each genre make the list unless a movie scores very highly """
+    genres_count = {}
+    selected = []
+    selected_keys = set()
+
+    def select(movie, key, genres):
+        selected.append(movie)
+        selected_keys.add(key)
+        for genre in genres:
+            genres_count[genre] = genres_count.get(genre, 0) + 1
+
+    # Include the top movies regardless of genre
+    for position, movie in enumerate(scored_movies[:guaranteed]):
+        select(movie, movie_key(movie, position), genre_keys(movie, empty_as_unknown=False))
+
+    # Movies scoring close to the best one are added despite the genre cap
+    max_score = scored_movies[0].get("recommendation_score", 0)
+    high_score_threshold = max_score * high_score_ratio
+
+    # Apply diversity filter for remaining slots
+    for position, movie in enumerate(scored_movies):
+        key = movie_key(movie, position)
+        if key in selected_keys:
+            continue
+
+        genres = genre_keys(movie)
+        exceeds_cap = any(genres_count.get(genre, 0) >= max_per_genre for genre in genres)
+        is_high_score = high_score_threshold > 0 and movie.get("recommendation_score", 0) >= high_score_threshold
+
+        if not exceeds_cap or is_high_score:
+            select(movie, key, genres)
+
+        # Stop once we have enough recommendations
+        if len(selected) >= top_n:
+            break
+
+    # If we still need more, add remaining movies in score order
+    for position, movie in enumerate(scored_movies):
+        if len(selected) >= top_n:
+            break
+        key = movie_key(movie, position)
+        if key not in selected_keys:
+            selected.append(movie)
+            selected_keys.add(key)
+
+    return selected[:top_n]
+
+def align_movie_vectors(scored_movies, movie_ids, vectors):
+    """ Reorder vector rows (one per id in movie_ids) to follow scored_movies, or None if any movie has no vector """
+    if vectors is None:
+        return None
+
+    rows = {}
+    for row, movie_id in enumerate(movie_ids):
+        rows.setdefault(movie_id, row)
+
+    try:
+        return vectors[[rows[movie.get("id")] for movie in scored_movies]]
+    except KeyError:
+        return None
+
+def mmr_diversity(scored_movies, top_n=20, movie_vectors=None, mmr_lambda=0.7, pool_size=200, **options):
+    """ Maximal Marginal Relevance: greedily pick the movie with the best mix of score and dissimilarity to those already picked """
+    # Without profile vectors there is nothing to measure redundancy with
+    if movie_vectors is None or movie_vectors.shape[0] != len(scored_movies):
+        print("MMR needs a profile vector for every movie, using genre_cap")
+        return genre_cap_diversity(scored_movies, top_n=top_n, **options)
+
+    # Only the best scoring movies can realistically make the list
+    pool = min(len(scored_movies), max(pool_size, top_n))
+    vectors = movie_vectors[:pool]
+
+    # Relevance scaled to [0, 1] so it is comparable with cosine similarity
+    relevance = np.array([movie.get("recommendation_score", 0) or 0 for movie in scored_movies[:pool]], dtype=np.float64)
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+
+    # Candidate-candidate similarity block (profile vectors are L2 normalised)
+    similarity = vectors @ vectors.T
+    similarity = similarity.toarray() if hasattr(similarity, "toarray") else np.asarray(similarity)
+
+    selected = []
+    max_similarity = np.zeros(pool)
+    available = np.ones(pool, dtype=bool)
+
+    for _ in range(min(top_n, pool)):
+        mmr_scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        mmr_scores[~available] = -np.inf
+        best = int(np.argmax(mmr_scores))
+
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+    return [scored_movies[position] for position in selected]
+
+# Re-ranking strategies selectable by name (strategies ignore options they don't use)
+DIVERSITY_STRATEGIES = {
+    "genre_cap": genre_cap_diversity,
+    "mmr": mmr_diversity
+}
+
+def ensure_diversity(scored_movies, max_per_genre=5, top_n=20, strategy="genre_cap", **options):
+    """ Diversity filter with balance between relevance and variety."""
+    # Safety check for empty input
+    if not scored_movies:
+        print("WARNING: No scored movies provided to diversity filter")
+        return []
+
+    rerank = DIVERSITY_STRATEGIES.get(strategy)
+    if rerank is None:
+        print(f"Unknown diversity strategy '{strategy}', using genre_cap")
+        rerank = genre_cap_diversity
+
+    return rerank(scored_movies, top_n=top_n, max_per_genre=max_per_genre, **options)
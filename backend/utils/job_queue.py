@@ -0,0 +1,124 @@
+import time
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from config import get_config
+from utils.cache_utils import get_cached_data, set_cached_data
+
+config = get_config()
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class JobQueue:
+    """ Local worker pool that runs slow jobs out of band and tracks their status """
+
+    def __init__(self, max_workers=2, retention=3600):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._lock = threading.Lock()
+        # job id -> job record, and dedupe key -> id of the latest job for that key
+        self._jobs = {}
+        self._latest = {}
+
+    def _store(self, job):
+        """ Keep a copy of the job in the shared cache so any worker process can report its status """
+        self._jobs[job["id"]] = job
+        set_cached_data(f"job:{job['id']}", dict(job), ttl=self.retention)
+        # The pointer to a key's latest job is shared too, so any worker can find it
+        if self._latest.get(job["key"]) == job["id"]:
+            set_cached_data(f"job_latest:{job['key']}", job["id"], ttl=self.retention)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            self._store(job)
+
+    def _prune(self):
+        """ Forget finished jobs older than the retention window """
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] in (DONE, FAILED) and (job.get("finished_at") or 0) < cutoff:
+                del self._jobs[job_id]
+                if self._latest.get(job.get("key")) == job_id:
+                    del self._latest[job["key"]]
+
+    def submit(self, job_type, key, func, *args, owner=None, retry_after=0, **kwargs):
+        """ Queue func(*args, **kwargs) unless a job with the same key is queued, running,
+        or failed less than retry_after seconds ago, in which case that job is returned """
+        with self._lock:
+            self._prune()
+
+            latest = self._jobs.get(self._latest.get(key))
+            if latest:
+                if latest["status"] in (QUEUED, RUNNING):
+                    return dict(latest)
+                if latest["status"] == FAILED and time.time() - (latest.get("finished_at") or 0) < retry_after:
+                    return dict(latest)
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "type": job_type,
+                "key": key,
+                "owner": owner,
+                "status": QUEUED,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self._latest[key] = job["id"]
+            self._store(job)
+
+        self._executor.submit(self._run, job["id"], func, args, kwargs)
+        return dict(job)
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = func(*args, **kwargs)
+            self._update(job_id, status=DONE, finished_at=time.time(), result=result)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            traceback.print_exc()
+            self._update(job_id, status=FAILED, finished_at=time.time(), error=str(e))
+
+    def get(self, job_id):
+        """ Get a job's status from this worker, or from the shared cache if another worker owns it """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return get_cached_data(f"job:{job_id}")
+
+    def latest(self, key):
+        """ Get the most recent job for a dedupe key, whichever worker started it """
+        job_id = get_cached_data(f"job_latest:{key}")
+        if job_id:
+            job = self.get(job_id)
+            if job:
+                return job
+
+        # The shared cache may have dropped the pointer, fall back to this worker's own jobs
+        with self._lock:
+            job = self._jobs.get(self._latest.get(key))
+            return dict(job) if job else None
+
+    def stats(self):
+        """ Get job counts by status for monitoring """
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return counts
+
+# Single queue shared by every route in this worker
+job_queue = JobQueue(max_workers=config.JOB_WORKERS, retention=config.JOB_RETENTION_SECONDS)
@@ -0,0 +1,97 @@
+import os
+import numpy as np
+
+# Random hyperplanes shared by every table, one column per (table, bit)
+PLANES_FILE = "lsh_planes.npy"
+# Per table, row numbers ordered by bucket code, and the matching sorted codes
+ORDER_FILE = "lsh_order.npy"
+CODES_FILE = "lsh_codes.npy"
+# Bucket codes are packed into uint32
+MAX_LSH_BITS = 32
+
+def hash_codes(vectors, planes, n_tables, n_bits):
+    """ Hash vectors to one bucket code per table from the signs of their random projections """
+    projections = np.asarray(vectors @ planes)
+    bits = (projections > 0).reshape(projections.shape[0], n_tables, n_bits)
+    return (bits * (1 << np.arange(n_bits, dtype=np.uint32))).sum(axis=2, dtype=np.uint32)
+
+class LSHIndex:
+    """ Random-projection LSH over the catalog movie vectors for approximate cosine nearest neighbours """
+
+    def __init__(self, planes, order, codes):
+        self.planes = planes
+        self.order = order
+        self.codes = codes
+        self.n_tables = order.shape[0]
+        self.n_bits = planes.shape[1] // self.n_tables
+
+    def candidate_rows(self, query_vectors):
+        """ Get the rows sharing a bucket (or one bit away from it) with any query in any table """
+        query_codes = hash_codes(query_vectors, self.planes, self.n_tables, self.n_bits)
+
+        # Probe the exact bucket plus every bucket one flipped bit away to improve recall
+        flips = np.concatenate(([0], 1 << np.arange(self.n_bits, dtype=np.uint32))).astype(np.uint32)
+
+        found = []
+        for table in range(self.n_tables):
+            probes = np.unique((query_codes[:, table][:, None] ^ flips[None, :]).ravel())
+            starts = np.searchsorted(self.codes[table], probes, side="left")
+            ends = np.searchsorted(self.codes[table], probes, side="right")
+            for start, end in zip(starts, ends):
+                if end > start:
+                    found.append(self.order[table][start:end])
+
+        if not found:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def nearest(self, query_vectors, movie_vectors, top_k=100):
+        """ Get (row, similarity) for the top_k catalog movies closest to any of the query vectors """
+        # Vectors with no known terms carry no signal and would all land in the same bucket
+        query_vectors = query_vectors[np.asarray(query_vectors.getnnz(axis=1)) > 0]
+        if query_vectors.shape[0] == 0:
+            return []
+
+        rows = self.candidate_rows(query_vectors)
+        if len(rows) == 0:
+            return []
+
+        # Exact cosine similarity (vectors are L2 normalised) over the retrieved rows only
+        similarities = np.asarray((movie_vectors[rows] @ query_vectors.T).max(axis=1).todense()).ravel()
+
+        if len(rows) > top_k:
+            best = np.argpartition(-similarities, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(rows))
+        best = best[np.argsort(-similarities[best], kind="stable")]
+        return [(int(rows[i]), float(similarities[i])) for i in best if similarities[i] > 0]
+
+def build_lsh_index(movie_vectors, version_dir, n_tables=16, n_bits=10, seed=42):
+    """ Hash every catalog vector and save the index next to the TF-IDF model version """
+    # More bits than the codes hold would silently wrap and merge buckets
+    if not 1 <= n_bits <= MAX_LSH_BITS:
+        raise ValueError(f"LSH_BITS must be between 1 and {MAX_LSH_BITS}, got {n_bits}")
+    if n_tables < 1:
+        raise ValueError(f"LSH_TABLES must be at least 1, got {n_tables}")
+
+    rng = np.random.default_rng(seed)
+    planes = rng.standard_normal((movie_vectors.shape[1], n_tables * n_bits)).astype(np.float32)
+    codes = hash_codes(movie_vectors, planes, n_tables, n_bits)
+
+    order = np.argsort(codes, axis=0, kind="stable").T.astype(np.int32)
+    sorted_codes = np.take_along_axis(codes.T, order.astype(np.int64), axis=1)
+
+    np.save(os.path.join(version_dir, PLANES_FILE), planes)
+    np.save(os.path.join(version_dir, ORDER_FILE), np.ascontiguousarray(order))
+    np.save(os.path.join(version_dir, CODES_FILE), np.ascontiguousarray(sorted_codes))
+
+def load_lsh_index(version_dir):
+    """ Memory-map a saved index, or None if this model version was built without one """
+    if not os.path.exists(os.path.join(version_dir, PLANES_FILE)):
+        return None
+
+    return LSHIndex(
+        np.load(os.path.join(version_dir, PLANES_FILE), mmap_mode="r"),
+        np.load(os.path.join(version_dir, ORDER_FILE), mmap_mode="r"),
+        np.load(os.path.join(version_dir, CODES_FILE), mmap_mode="r")
+    )
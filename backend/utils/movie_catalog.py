@@ -0,0 +1,170 @@
+import json
+from datetime import datetime, timedelta
+from database import get_db_connection
+from config import get_config
+
+config = get_config()
+
+# Only the credits we actually use are kept, full TMDB crew lists run to hundreds of rows
+CATALOG_CAST_LIMIT = 20
+CATALOG_CREW_JOBS = {'Director', 'Screenplay', 'Writer', 'Producer', 'Original Music Composer'}
+
+# Keys from the TMDB bundle that are stored in their own columns
+BUNDLE_EXTRA_KEYS = ('credits', 'keywords', 'release_dates', 'content_ratings')
+
+def extract_certification(bundle):
+    """ Get the US certification from a TMDB bundle """
+    release_dates = (bundle.get("release_dates") or {}).get("results", [])
+    for country in release_dates:
+        if country.get("iso_3166_1") == "US":
+            for release in country.get("release_dates", []):
+                if release.get("certification"):
+                    return release.get("certification")
+            break
+    return None
+
+def is_catalog_row_fresh(row, ttl_hours=None):
+    """ Check if a catalog row is still inside the refresh window """
+    if ttl_hours is None:
+        ttl_hours = config.MOVIE_CATALOG_TTL_HOURS
+
+    last_fetched = row.get('last_fetched')
+    if not last_fetched:
+        return False
+    return datetime.now() - last_fetched < timedelta(hours=ttl_hours)
+
+def catalog_row_to_bundle(row):
+    """ Rebuild a TMDB style bundle from a catalog row """
+    bundle = json.loads(row.get('details') or "{}")
+    bundle["credits"] = {
+        "cast": json.loads(row.get('cast_members') or "[]"),
+        "crew": json.loads(row.get('crew_members') or "[]")
+    }
+    bundle["keywords"] = {
+        "keywords": [{"name": keyword} for keyword in json.loads(row.get('keywords') or "[]")]
+    }
+
+    # Rebuild the release dates block so existing content rating lookups keep working
+    certification = row.get('certification')
+    bundle["release_dates"] = {
+        "results": [{"iso_3166_1": "US", "release_dates": [{"certification": certification}]}] if certification else []
+    }
+    return bundle
+
+def get_catalog_rows(movie_ids):
+    """ Get catalog rows for several movies with a single query """
+    movie_ids = [int(movie_id) for movie_id in movie_ids if movie_id]
+    if not movie_ids:
+        return {}
+
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+
+    try:
+        placeholders = ', '.join(['%s'] * len(movie_ids))
+        cursor.execute(f"""
+            SELECT movie_id, details, cast_members, crew_members, keywords, certification, last_fetched
+            FROM movie_catalog
+            WHERE movie_id IN ({placeholders})
+        """, tuple(movie_ids))
+        return {row['movie_id']: row for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        connection.close()
+
+def get_catalog_bundles(movie_ids, include_stale=False):
+    """ Get stored bundles for several movies, skipping rows past their TTL unless asked """
+    try:
+        rows = get_catalog_rows(movie_ids)
+    except Exception as e:
+        print(f"Error reading movie catalog: {e}")
+        return {}
+
+    bundles = {}
+    for movie_id, row in rows.items():
+        if include_stale or is_catalog_row_fresh(row):
+            try:
+                bundles[movie_id] = catalog_row_to_bundle(row)
+            except (TypeError, ValueError) as e:
+                print(f"Error decoding catalog row for movie {movie_id}: {e}")
+    return bundles
+
+def get_catalog_bundle(movie_id, include_stale=False):
+    """ Get the stored bundle for a movie, or None if it is missing or stale """
+    try:
+        movie_id = int(movie_id)
+    except (TypeError, ValueError):
+        return None
+    return get_catalog_bundles([movie_id], include_stale=include_stale).get(movie_id)
+
+def catalog_row(movie_id, bundle):
+    """ Build the movie_catalog row values for a TMDB bundle """
+    credits = bundle.get("credits") or {}
+    cast = [
+        {
+            "id": member.get("id"),
+            "name": member.get("name"),
+            "character": member.get("character"),
+            "order": member.get("order"),
+            "profile_path": member.get("profile_path")
+        }
+        for member in credits.get("cast", [])[:CATALOG_CAST_LIMIT]
+    ]
+    crew = [
+        {
+            "id": member.get("id"),
+            "name": member.get("name"),
+            "job": member.get("job"),
+            "department": member.get("department")
+        }
+        for member in credits.get("crew", []) if member.get("job") in CATALOG_CREW_JOBS
+    ]
+    keywords = [keyword.get("name") for keyword in (bundle.get("keywords") or {}).get("keywords", [])]
+    details = {key: value for key, value in bundle.items() if key not in BUNDLE_EXTRA_KEYS}
+
+    return (
+        int(movie_id),
+        str(bundle.get("title", ""))[:255],
+        json.dumps(details),
+        json.dumps(cast),
+        json.dumps(crew),
+        json.dumps(keywords),
+        extract_certification(bundle)
+    )
+
+def save_catalog_bundles(bundles):
+    """ Store several TMDB bundles in the movie catalog with one multi-row upsert """
+    rows = [catalog_row(movie_id, bundle) for movie_id, bundle in bundles.items() if bundle]
+    if not rows:
+        return False
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+
+    try:
+        cursor.executemany("""
+            INSERT INTO movie_catalog
+            (movie_id, title, details, cast_members, crew_members, keywords, certification, last_fetched)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+            title = VALUES(title),
+            details = VALUES(details),
+            cast_members = VALUES(cast_members),
+            crew_members = VALUES(crew_members),
+            keywords = VALUES(keywords),
+            certification = VALUES(certification),
+            last_fetched = NOW()
+        """, rows)
+        connection.commit()
+        return True
+    except Exception as e:
+        connection.rollback()
+        print(f"Error saving {len(rows)} movies to catalog: {e}")
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+def save_catalog_bundle(movie_id, bundle):
+    """ Store a TMDB bundle in the movie catalog """
+    return save_catalog_bundles({movie_id: bundle})
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+from database import get_db_connection
+from utils.movie_utils import normalize_movie_title, resolve_movie_id_by_title
+
+def get_indexed_titles(titles):
+    """ Get the stored TMDB id for several titles with a single query, keyed by normalized title """
+    normalized_titles = list({normalize_movie_title(title) for title in titles if title} - {""})
+    if not normalized_titles:
+        return {}
+
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+
+    try:
+        placeholders = ', '.join(['%s'] * len(normalized_titles))
+        cursor.execute(f"""
+            SELECT normalized_title, movie_id FROM movie_title_index
+            WHERE normalized_title IN ({placeholders})
+        """, tuple(normalized_titles))
+        return {row['normalized_title']: row['movie_id'] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        connection.close()
+
+def save_indexed_titles(resolved_titles):
+    """ Store title -> TMDB id pairs with one multi-row upsert """
+    rows = [
+        (normalize_movie_title(title)[:255], str(title)[:255], int(movie_id))
+        for title, movie_id in resolved_titles.items() if movie_id and normalize_movie_title(title)
+    ]
+    if not rows:
+        return
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+
+    try:
+        cursor.executemany("""
+            INSERT INTO movie_title_index (normalized_title, title, movie_id, resolved_at)
+            VALUES (%s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+            title = VALUES(title),
+            movie_id = VALUES(movie_id),
+            resolved_at = NOW()
+        """, rows)
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        print(f"Error saving movie title index: {e}")
+    finally:
+        cursor.close()
+        connection.close()
+
+def resolve_title_ids(titles, max_workers=8):
+    """ Get {title: movie_id or None}, reading the index and only searching TMDB for titles it doesn't have """
+    try:
+        indexed = get_indexed_titles(titles)
+    except Exception as e:
+        print(f"Error reading movie title index: {e}")
+        indexed = {}
+
+    resolved = {title: indexed.get(normalize_movie_title(title)) for title in titles if title}
+    missing = [title for title, movie_id in resolved.items() if not movie_id]
+    if not missing:
+        return resolved
+
+    def resolve(title):
+        try:
+            return resolve_movie_id_by_title(title)
+        except Exception as e:
+            print(f"Error resolving movie title {title}: {e}")
+            return None
+
+    # Resolve every missing title at once and remember the ones TMDB found
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        found = dict(zip(missing, executor.map(resolve, missing)))
+    resolved.update(found)
+    save_indexed_titles(found)
+    return resolved
+
+def index_favourite_titles(titles):
+    """ Resolve and store a user's favourite titles so recommendation runs find them in the index """
+    resolved = resolve_title_ids(titles)
+    return {"indexed": sum(1 for movie_id in resolved.values() if movie_id)}
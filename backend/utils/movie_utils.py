@@ -3,7 +3,6 @@ import json
 import nltk
 import os
 from collections import Counter
-import requests
 import ast
 from datetime import datetime, timedelta
 
@@ -126,9 +125,12 @@ def safe_initialize_nltk():
 safe_initialize_nltk()
 
 from config import get_config
+from utils.tmdb_client import tmdb_client
+from utils.movie_catalog import get_catalog_bundle, get_catalog_bundles, save_catalog_bundle, save_catalog_bundles
+from utils.cache_utils import get_or_compute_cached_data
+from concurrent.futures import ThreadPoolExecutor
 
 config = get_config()
-TMDB_KEY = config.TMDB_API_KEY
 
 THEME_KEYWORDS = {
     'redemption': ['redemption', 'redeem', 'second chance', 'forgiveness', 'atone', 'atonement', 'salvation'],
@@ -396,8 +398,7 @@ FRANCHISES = {
 
 def fetch_genre_mapping():
     """ Fetch the mapping of genre IDs to names from TMDB """
-    url = f"https://api.themoviedb.org/3/genre/movie/list?api_key={TMDB_KEY}&language=en-US"
-    response = requests.get(url)
+    response = tmdb_client.get("/genre/movie/list", params={"language": "en-US"})
     genre_dict = {}
     
     if response.status_code == 200:
@@ -411,96 +412,166 @@ def fetch_genre_mapping():
         print("Failed to fetch genre mapping")
         return {}
 
-def get_actors(movie_id):
-    """ Get the top 5 cast members for a movie """
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/credits?api_key={TMDB_KEY}&language=en-US"
-    response = requests.get(url)
+def extract_actors(credits):
+    """ Get the top 5 cast member names from a TMDB credits object """
     actors = []
+    cast_list = (credits or {}).get("cast", [])[:5]
+    for cast_member in cast_list:
+        actor_name = cast_member["name"]
+        actors.append(actor_name)
+    return actors
 
-    if response.status_code == 200:
-        credits = response.json()
-        cast_list = credits.get("cast", [])[:5]  
-        for cast_member in cast_list:
-            actor_name = cast_member["name"]
-            actors.append(actor_name)
-        return actors
-    return []
-
-def get_director(movie_id):
-    """ Get the directors of a movie """
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/credits?api_key={TMDB_KEY}&language=en-US"
-    response = requests.get(url)
+def extract_directors(credits):
+    """ Get the director names from a TMDB credits object """
     directors = []
+    crew = (credits or {}).get("crew", [])
+    for crew_member in crew:
+        if crew_member.get("job") == "Director":
+            directors.append(crew_member.get("name"))
+    return directors
 
-    if response.status_code == 200:
-        credits = response.json()
-        crew = credits.get("crew", [])
-        for crew_member in crew:
-            if crew_member.get("job") == "Director":
-                directors.append(crew_member.get("name"))
-        return directors
-    return []
+def extract_keywords(keywords_data):
+    """ Get keyword names from a TMDB keywords object """
+    return [keyword["name"] for keyword in (keywords_data or {}).get("keywords", [])]
 
-def fetch_movie_details(movie_id):
-    """ Fetch detailed information about a movie """
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_KEY}&language=en-US&append_to_response=release_dates,content_ratings"
-    response = requests.get(url)
+def format_movie_details(data):
+    """ Turn a raw TMDB movie object into the details dict used for profiling """
     genre_list = []
-
-    if response.status_code == 200:
-        data = response.json()
-        for genre in data.get("genres", []):
-            genre_name = genre["name"]
-            genre_list.append(genre_name)
-            
-        # Get content rating 
-        content_rating = "Not Rated"
-        release_dates = data.get("release_dates", {}).get("results", [])
-        for country in release_dates:
-            if country.get("iso_3166_1") == "US": 
-                for release in country.get("release_dates", []):
-                    if release.get("certification"):
-                        content_rating = release.get("certification")
-                        break
-                break
+    for genre in data.get("genres", []):
+        genre_name = genre["name"]
+        genre_list.append(genre_name)
         
-        return {
-            "title": data.get("title", ""),
-            "original_title": data.get("original_title", ""),
-            "overview": data.get("overview", ""),
-            "poster_path": data.get("poster_path", ""),
-            "backdrop_path": data.get("backdrop_path", ""),
-            "release_date": data.get("release_date", ""),
-            "vote_average": data.get("vote_average", 0),
-            "vote_count": data.get("vote_count", 0),
-            "runtime": data.get("runtime", 0),
-            "budget": data.get("budget", 0),
-            "revenue": data.get("revenue", 0),
-            "popularity": data.get("popularity", 0),
-            "adult": data.get("adult", False),
-            "content_rating": content_rating,
-            "genres": genre_list,
-            "original_language": data.get("original_language", ""),
-            "production_companies": [company.get("name") for company in data.get("production_companies", [])],
-            "production_countries": [country.get("name") for country in data.get("production_countries", [])]
-        }
-    else:
-        print(f"Failed to retrieve data for {movie_id}")
-        return None    
+    # Get content rating 
+    content_rating = "Not Rated"
+    release_dates = data.get("release_dates", {}).get("results", [])
+    for country in release_dates:
+        if country.get("iso_3166_1") == "US": 
+            for release in country.get("release_dates", []):
+                if release.get("certification"):
+                    content_rating = release.get("certification")
+                    break
+            break
+    
+    return {
+        "title": data.get("title", ""),
+        "original_title": data.get("original_title", ""),
+        "overview": data.get("overview", ""),
+        "poster_path": data.get("poster_path", ""),
+        "backdrop_path": data.get("backdrop_path", ""),
+        "release_date": data.get("release_date", ""),
+        "vote_average": data.get("vote_average", 0),
+        "vote_count": data.get("vote_count", 0),
+        "runtime": data.get("runtime", 0),
+        "budget": data.get("budget", 0),
+        "revenue": data.get("revenue", 0),
+        "popularity": data.get("popularity", 0),
+        "adult": data.get("adult", False),
+        "content_rating": content_rating,
+        "genres": genre_list,
+        "original_language": data.get("original_language", ""),
+        "production_companies": [company.get("name") for company in data.get("production_companies", [])],
+        "production_countries": [country.get("name") for country in data.get("production_countries", [])]
+    }
 
-def fetch_keywords_for_movies(movie_id):
-    """ Fetch keywords for a movie """
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/keywords?api_key={TMDB_KEY}"
-    response = requests.get(url)
+def bundle_to_candidate_movie(movie_id, bundle):
+    """ Turn a movie bundle into the candidate shape returned by the movies route """
+    details = format_movie_details(bundle)
+    return {
+        "id": int(movie_id),
+        "title": details["title"],
+        "original_title": details["original_title"],
+        "overview": details["overview"],
+        "poster_path": details["poster_path"],
+        "backdrop_path": details["backdrop_path"],
+        "release_date": details["release_date"],
+        "vote_average": details["vote_average"],
+        "vote_count": details["vote_count"],
+        "popularity": details["popularity"],
+        "adult": details["adult"],
+        "original_language": details["original_language"],
+        "genres": details["genres"],
+        "actors": extract_actors(bundle.get("credits", {}))
+    }
+
+def fetch_catalog_candidates(movie_ids):
+    """ Build candidate movies from the local catalog only, without calling TMDB """
+    bundles = get_catalog_bundles(movie_ids, include_stale=True)
+    return [bundle_to_candidate_movie(movie_id, bundles[int(movie_id)]) for movie_id in movie_ids if int(movie_id) in bundles]
+
+def get_actors(movie_id):
+    """ Get the top 5 cast members for a movie """
+    bundle = fetch_movie_bundle(movie_id)
+
+    if bundle:
+        return extract_actors(bundle.get("credits", {}))
+    return []
+
+def fetch_movie_bundle_from_tmdb(movie_id):
+    """ Fetch details, credits, keywords and release dates for a movie in one request """
+    try:
+        response = tmdb_client.get(f"/movie/{movie_id}", params={
+            "language": "en-US",
+            "append_to_response": "credits,keywords,release_dates"
+        })
+    except Exception as e:
+        print(f"TMDB request for movie {movie_id} failed: {e}")
+        return None
 
     if response.status_code == 200:
-        data = response.json()
-        return {
-            "keywords": [keyword["name"] for keyword in data.get("keywords", [])]
-        }
+        return response.json()
     else:
-        print(f"Failed to retrieve keywords for {movie_id}")
-        return {"keywords": []}
+        print(f"Failed to retrieve movie bundle for {movie_id}")
+        return None
+
+def fetch_movie_bundle(movie_id):
+    """ Get a movie bundle, reading through the local movie catalog """
+    bundle = get_catalog_bundle(movie_id)
+    if bundle:
+        return bundle
+
+    bundle = fetch_movie_bundle_from_tmdb(movie_id)
+    if bundle:
+        save_catalog_bundle(movie_id, bundle)
+        return bundle
+
+    # TMDB is unavailable so serve an expired catalog entry if we have one
+    return get_catalog_bundle(movie_id, include_stale=True)
+
+def fetch_movie_bundles(movie_ids, max_workers=8):
+    """ Get bundles for several movies with one catalog query and concurrent TMDB fetches for misses """
+    movie_ids = list(dict.fromkeys(int(movie_id) for movie_id in movie_ids if movie_id))
+    bundles = get_catalog_bundles(movie_ids)
+
+    missing_ids = [movie_id for movie_id in movie_ids if movie_id not in bundles]
+    if missing_ids:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = {
+                movie_id: bundle
+                for movie_id, bundle in zip(missing_ids, executor.map(fetch_movie_bundle_from_tmdb, missing_ids))
+                if bundle
+            }
+        # Every fetched bundle goes into the catalog with one upsert
+        save_catalog_bundles(fetched)
+        bundles.update(fetched)
+
+        # Fall back to expired entries for anything TMDB could not return
+        still_missing = [movie_id for movie_id in missing_ids if movie_id not in bundles]
+        if still_missing:
+            bundles.update(get_catalog_bundles(still_missing, include_stale=True))
+    return bundles
+
+def parse_movie_bundle(bundle):
+    """ Split a movie bundle into details, cast, crew and keywords """
+    if not bundle:
+        return None
+
+    credits = bundle.get("credits", {})
+    return {
+        "details": format_movie_details(bundle),
+        "actors": extract_actors(credits),
+        "directors": extract_directors(credits),
+        "keywords": extract_keywords(bundle.get("keywords", {}))
+    }
 
 def preprocess_text(text):
     """ Clean and preprocess text for analysis """
@@ -818,41 +889,25 @@ def extract_core_concepts(text, n=5):
     
     return common_words[:n]  
 
-def build_enhanced_movie_profile(movie_id):
+def build_enhanced_movie_profile(movie_id, bundle=None):
     """ Build text profile of a movie """
     try:
-        # Fetch movie data
-        movie_details = fetch_movie_details(movie_id)
-        if not movie_details:
+        # Fetch details, credits and keywords in a single request
+        if bundle is None:
+            bundle = fetch_movie_bundle(movie_id)
+        movie_data = parse_movie_bundle(bundle)
+        if not movie_data:
             print(f"Could not fetch movie details for ID {movie_id}")
             return None
         
         # Get basic movie information
+        movie_details = movie_data["details"]
         title = movie_details.get('title', '')
         overview = movie_details.get('overview', '')
         genres = movie_details.get('genres', [])
-        
-        # Try to get actors
-        try:
-            actors = get_actors(movie_id)
-        except Exception as e:
-            print(f"Error getting actors for movie {movie_id}: {e}")
-            actors = []
-        
-        # Try to get directors
-        try:
-            directors = get_director(movie_id)
-        except Exception as e:
-            print(f"Error getting directors for movie {movie_id}: {e}")
-            directors = []
-        
-        # Try to get keywords
-        try:
-            keywords_data = fetch_keywords_for_movies(movie_id)
-            keywords = keywords_data.get("keywords", [])
-        except Exception as e:
-            print(f"Error getting keywords for movie {movie_id}: {e}")
-            keywords = []
+        actors = movie_data["actors"]
+        directors = movie_data["directors"]
+        keywords = movie_data["keywords"]
         
         # Extract themes 
         try:
@@ -947,8 +1002,17 @@ def parse_list_from_db(list_str):
     """ Safely parse a list string from the database """
     if not list_str:
         return []
+
+    # JSON columns can come back from the connector as bytes
+    if isinstance(list_str, (bytes, bytearray)):
+        list_str = list_str.decode("utf-8")
         
     if isinstance(list_str, str):
+        # Lists are stored as JSON, rows written before that hold Python list literals
+        try:
+            return json.loads(list_str)
+        except ValueError:
+            pass
         try:
             return ast.literal_eval(list_str)
         except (SyntaxError, ValueError) as e:
@@ -956,36 +1020,44 @@ def parse_list_from_db(list_str):
             return []
     return list_str
 
+def encode_list_for_db(values):
+    """ Encode a list for a list column (JSON) """
+    return json.dumps(list(values or []))
+
 def fetch_movie(movie_id):
     """ Fetch a single movie by ID """
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_KEY}&language=en-US"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    return None
+    return fetch_movie_bundle(movie_id)
+
+def normalize_movie_title(title):
+    """ Lowercase a title and strip its punctuation so spelling variants compare equal """
+    return re.sub(r'[^\w\s]', '', str(title).lower().strip())
 
-def fetch_movie_by_title(title):
-    """ Fetch a single movie by exact title match """
-    # First search for movies with similar titles
-    search_url = f"https://api.themoviedb.org/3/search/movie?api_key={TMDB_KEY}&query={title}&language=en-US"
-    response = requests.get(search_url)
+def search_movie_id_by_title(title):
+    """ Get the TMDB id of the movie with exactly this title using a single search request """
+    response = tmdb_client.get("/search/movie", params={"query": title, "language": "en-US"})
     
     if response.status_code != 200:
         return None
     
     # Find exact title match (case-insensitive)
-    movies = response.json().get("results", [])
-    for movie in movies:
-        if movie.get("title", "").lower() == title.lower():
-            # Get detials
-            movie_id = movie.get("id")
-            if movie_id:
-                details_url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_KEY}&language=en-US"
-                details_response = requests.get(details_url)
-                if details_response.status_code == 200:
-                    return details_response.json()
+    for movie in response.json().get("results", []):
+        if movie.get("title", "").lower() == title.lower() and movie.get("id"):
+            return movie.get("id")
     return None
 
+def resolve_movie_id_by_title(title):
+    """ Get the TMDB id for a title, searching TMDB only the first time a title is seen """
+    normalized = normalize_movie_title(title)
+    if not normalized:
+        return None
+
+    # Titles that can't be found aren't cached, they are searched again next time
+    return get_or_compute_cached_data(
+        f"title_movie_id:{normalized}",
+        lambda: search_movie_id_by_title(title),
+        ttl=config.TITLE_ID_CACHE_TTL
+    )
+
 def fetch_movies_by_genre(genre, limit=30):
     """ Fetch movies by genre from TMDB API """
     # First get the genre ID from the name
@@ -1002,16 +1074,19 @@ def fetch_movies_by_genre(genre, limit=30):
         print(f"Genre '{genre}' not found in genre mapping")
         return []
     
-    url = f"https://api.themoviedb.org/3/discover/movie?api_key={TMDB_KEY}&with_genres={genre_id}&sort_by=popularity.desc&page=1&vote_count.gte=100"
-    response = requests.get(url)
+    response = tmdb_client.get("/discover/movie", params={
+        "with_genres": genre_id,
+        "sort_by": "popularity.desc",
+        "page": 1,
+        "vote_count.gte": 100
+    })
     if response.status_code == 200:
         return response.json().get("results", [])[:limit]
     return []
 
 def fetch_movies_by_keyword(keyword, limit=20):
     """ Fetch movies by keyword from TMDB API """
-    url = f"https://api.themoviedb.org/3/search/movie?api_key={TMDB_KEY}&query={keyword}&page=1"
-    response = requests.get(url)
+    response = tmdb_client.get("/search/movie", params={"query": keyword, "page": 1})
     if response.status_code == 200:
         return response.json().get("results", [])[:limit]
     return []
@@ -1022,11 +1097,8 @@ def is_same_movie(candidate_title, favourite_title, threshold=0.8):
         return False
     
     # Normalise titles
-    def normalize_title(title):
-        return re.sub(r'[^\w\s]', '', title.lower().strip())
-    
-    candidate_norm = normalize_title(candidate_title)
-    favourite_norm = normalize_title(favourite_title)
+    candidate_norm = normalize_movie_title(candidate_title)
+    favourite_norm = normalize_movie_title(favourite_title)
     
     if candidate_norm == favourite_norm:
         return True
@@ -1051,3 +1123,31 @@ def is_same_movie(candidate_title, favourite_title, threshold=0.8):
     
     return False
 
+def index_title_words(titles):
+    """ Map each word to the titles containing it, so a candidate is only compared with titles it shares a word with """
+    title_words = {}
+    for title in titles:
+        words = normalize_movie_title(title).split() or [""]
+        for word in set(words):
+            title_words.setdefault(word, []).append(title)
+    return title_words
+
+def matches_indexed_title(candidate_title, title_words, threshold=0.8):
+    """ Same result as checking is_same_movie against every indexed title """
+    if not candidate_title:
+        return False
+
+    # Every kind of match in is_same_movie needs a word in common, apart from titles that are all punctuation
+    words = set(normalize_movie_title(candidate_title).split())
+    if words:
+        titles = [title for word in words | {""} for title in title_words.get(word, [])]
+    else:
+        titles = [title for word_titles in title_words.values() for title in word_titles]
+
+    checked = set()
+    for title in titles:
+        if title not in checked:
+            checked.add(title)
+            if is_same_movie(candidate_title, title, threshold):
+                return True
+    return False
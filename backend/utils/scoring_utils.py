@@ -0,0 +1,180 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Weights used when the user has no preference model yet
+DEFAULT_SCORING_WEIGHTS = {
+    "base_similarity": 0.2,
+    "genre_match": 0.3,
+    "actor_match": 0.15,
+    "theme_match": 0.15,
+    "tone_match": 0.05,
+    "franchise_match": 0.05,
+    "audience_match": 0.05,
+    "rating_boost": 0.05
+}
+
+def as_feature_list(value):
+    """ Treat anything that isn't a list as having no values """
+    return value if isinstance(value, list) else []
+
+def encode_feature_matrix(feature_lists):
+    """ Encode each movie's values for one feature as a sparse movie x value count matrix """
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+
+    for values in feature_lists:
+        for value in values:
+            try:
+                indices.append(vocabulary.setdefault(value, len(vocabulary)))
+            except TypeError:
+                # Unhashable values can't equal any of the user's (string) preferences
+                continue
+        indptr.append(len(indices))
+
+    data = np.ones(len(indices), dtype=np.float64)
+    matrix = csr_matrix((data, indices, indptr), shape=(len(feature_lists), max(len(vocabulary), 1)))
+    return matrix, vocabulary
+
+def count_matches(feature_lists, preferred_values):
+    """ Count, for every movie, how many of its values appear in the user's preferred values """
+    matrix, vocabulary = encode_feature_matrix(feature_lists)
+
+    preferred = np.zeros(matrix.shape[1], dtype=np.float64)
+    for value in preferred_values:
+        try:
+            column = vocabulary.get(value)
+        except TypeError:
+            continue
+        if column is not None:
+            preferred[column] = 1.0
+
+    return matrix @ preferred
+
+def match_ratio_boost(matches, preferred_count, weight):
+    """ Share of the user's preferred values a movie matched, capped at 1 and weighted """
+    if not preferred_count:
+        return np.zeros(len(matches))
+    return np.minimum(matches / preferred_count, 1.0) * weight
+
+def top_score_positions(rounded_scores, limit=None):
+    """ Positions of the best scores, highest first with ties kept in candidate order (same as a stable sort) """
+    count = len(rounded_scores)
+    if limit is None or limit >= count:
+        chosen = np.arange(count)
+    elif limit <= 0:
+        return np.array([], dtype=np.int64)
+    else:
+        # Everything above the limit-th best score, then as many ties on that score as still fit
+        cutoff = np.partition(rounded_scores, count - limit)[count - limit]
+        above = np.flatnonzero(rounded_scores > cutoff)
+        ties = np.flatnonzero(rounded_scores == cutoff)[:limit - len(above)]
+        chosen = np.concatenate((above, ties))
+
+    return chosen[np.lexsort((chosen, -rounded_scores[chosen]))]
+
+def score_candidate_movies(candidate_movies, movie_indices, max_scores, weights, scoring_context, limit=None):
+    """ Score candidates against the user's scoring context with array operations (no database or API calls),
+    returning the best `limit` of them (all if None) sorted by recommendation score """
+    combined_genres = scoring_context.get("combined_genres", [])
+    combined_actors = scoring_context.get("combined_actors", [])
+    liked_themes = scoring_context.get("liked_themes", [])
+    liked_tones = scoring_context.get("liked_tones", [])
+    liked_franchises = scoring_context.get("liked_franchises", [])
+    preferred_audience = scoring_context.get("target_age")
+
+    # Define default weights if none provided
+    if not weights:
+        weights = DEFAULT_SCORING_WEIGHTS
+
+    # Pull the per-movie fields out once, skipping any movie we can't read
+    movies = []
+    base_similarities = []
+    audiences = []
+    ratings = []
+
+    for idx, i in enumerate(movie_indices):
+        try:
+            movie = candidate_movies[i]
+
+            # Only well-rated movies with enough votes get a rating boost
+            rating = None
+            vote_average = movie.get("vote_average")
+            vote_count = movie.get("vote_count", 0)
+            if vote_average is not None and vote_count is not None and vote_count > 50:
+                try:
+                    rating = float(vote_average)
+                except (TypeError, ValueError) as e:
+                    print(f"DEBUG: Error processing rating: {e}")
+
+            base_similarities.append(max_scores[idx] if idx < len(max_scores) else 0.5)
+            audiences.append(movie.get("target_audience", "general"))
+            ratings.append(rating)
+            movies.append(movie)
+        except Exception as e:
+            print(f"DEBUG: Error scoring movie: {e}")
+
+    if not movies:
+        return []
+
+    # Base similarity score (from TF-IDF)
+    base_scores = np.asarray(base_similarities, dtype=np.float64) * weights.get("base_similarity", 0.2)
+
+    # Genre, actor, theme and tone boosts from the number of matching values
+    genre_matches = count_matches([as_feature_list(movie.get("genres", [])) for movie in movies], combined_genres)
+    genre_boosts = match_ratio_boost(genre_matches, len(combined_genres), weights.get("genre_match", 0.3))
+
+    actor_matches = count_matches([as_feature_list(movie.get("actors", [])) for movie in movies], combined_actors)
+    actor_boosts = np.minimum(actor_matches / 3, 1.0) * weights.get("actor_match", 0.15)
+
+    theme_matches = count_matches([as_feature_list(movie.get("themes", [])) for movie in movies], liked_themes)
+    theme_boosts = match_ratio_boost(theme_matches, len(liked_themes), weights.get("theme_match", 0.15))
+
+    tone_matches = count_matches([as_feature_list(movie.get("tones", [])) for movie in movies], liked_tones)
+    tone_boosts = match_ratio_boost(tone_matches, len(liked_tones), weights.get("tone_match", 0.05))
+
+    # Franchise matches count three times as much as the other boosts
+    franchise_matches = count_matches([as_feature_list(movie.get("franchises", [])) for movie in movies], liked_franchises)
+    franchise_boosts = match_ratio_boost(franchise_matches, len(liked_franchises), weights.get("franchise_match", 0.3)) * 3.0
+
+    # Target audience match, half credit for general audience movies
+    audience_boosts = np.zeros(len(movies))
+    if preferred_audience:
+        audience_weight = weights.get("audience_match", 0.05)
+        exact_audience = np.array([audience == preferred_audience for audience in audiences], dtype=bool)
+        general_audience = np.array([audience == "general" for audience in audiences], dtype=bool)
+        audience_boosts[general_audience] = audience_weight * 0.5
+        audience_boosts[exact_audience] = audience_weight
+
+    # Rating boost
+    rating_values = np.array([rating if rating is not None else np.nan for rating in ratings], dtype=np.float64)
+    rating_boosts = np.where(
+        np.isnan(rating_values), 0.0,
+        np.minimum(np.nan_to_num(rating_values) / 10, 1.0) * weights.get("rating_boost", 0.05)
+    )
+
+    # Calculate final score
+    final_scores = base_scores + genre_boosts + actor_boosts + theme_boosts + tone_boosts + franchise_boosts + audience_boosts + rating_boosts
+
+    # Rank on the rounded score like the stored recommendation_score, and only build dicts for the selected window
+    rounded_scores = np.array([round(score, 3) for score in final_scores.tolist()], dtype=np.float64)
+
+    # Add the scored movies to our list with score breakdown
+    scored_movies = []
+    for position in top_score_positions(rounded_scores, limit):
+        movie = movies[position]
+        scored_movie = dict(movie)
+        scored_movie["recommendation_score"] = float(rounded_scores[position])
+        scored_movie["_score_breakdown"] = {
+            "base_score": round(float(base_scores[position]), 3),
+            "genre_boost": round(float(genre_boosts[position]), 3),
+            "actor_boost": round(float(actor_boosts[position]), 3),
+            "theme_score": round(float(theme_boosts[position]), 3),
+            "tone_score": round(float(tone_boosts[position]), 3),
+            "franchise_score": round(float(franchise_boosts[position]), 3),
+            "audience_score": round(float(audience_boosts[position]), 3),
+            "rating_boost": round(float(rating_boosts[position]), 3)
+        }
+        scored_movies.append(scored_movie)
+
+    return scored_movies
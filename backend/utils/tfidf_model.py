@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import shutil
+import threading
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from config import get_config
+from database import get_db_connection
+from utils.lsh_index import build_lsh_index, load_lsh_index
+
+config = get_config()
+
+# Same settings the per-request vectorizer has always used
+TFIDF_PARAMS = {
+    "stop_words": "english",
+    "sublinear_tf": True,
+    "norm": "l2",
+    "max_df": 0.85,
+    "min_df": 2
+}
+
+# File in the model directory naming the version workers should load
+CURRENT_VERSION_FILE = "CURRENT"
+
+def new_vectorizer(vocabulary=None):
+    """ Create a TF-IDF vectorizer with the recommendation settings """
+    return TfidfVectorizer(vocabulary=vocabulary, **TFIDF_PARAMS)
+
+class TfidfModel:
+    """ Catalog-wide TF-IDF model with a stored vector for every profiled movie """
+
+    def __init__(self, version, vectorizer, movie_ids, movie_vectors, lsh_index=None):
+        self.version = version
+        self.vectorizer = vectorizer
+        # movie_ids is sorted, row i of movie_vectors belongs to movie_ids[i]
+        self.movie_ids = movie_ids
+        self.movie_vectors = movie_vectors
+        self.lsh_index = lsh_index
+
+    def movie_rows(self, movie_ids):
+        """ Get the matrix row for each movie id, or None for movies not in the model """
+        rows = []
+        for movie_id in movie_ids:
+            try:
+                movie_id = int(movie_id)
+            except (TypeError, ValueError):
+                rows.append(None)
+                continue
+
+            row = int(np.searchsorted(self.movie_ids, movie_id))
+            rows.append(row if row < len(self.movie_ids) and self.movie_ids[row] == movie_id else None)
+        return rows
+
+    def transform(self, texts):
+        """ Turn profile texts into vectors in the model's space """
+        return self.vectorizer.transform(texts)
+
+    def similar_movies(self, profiles, top_k=100):
+        """ Get (movie_id, similarity) for the catalog movies closest to any of the profiles """
+        if self.lsh_index is None or not profiles:
+            return []
+        nearest = self.lsh_index.nearest(self.transform(profiles), self.movie_vectors, top_k=top_k)
+        return [(int(self.movie_ids[row]), similarity) for row, similarity in nearest]
+
+    def candidate_matrix(self, movie_ids, profiles):
+        """ Get vectors for candidates, reusing stored vectors and only transforming unknown movies """
+        rows = self.movie_rows(movie_ids)
+        unknown = [position for position, row in enumerate(rows) if row is None]
+
+        if not unknown:
+            return self.movie_vectors[rows]
+        known = [position for position, row in enumerate(rows) if row is not None]
+        if not known:
+            return self.transform(profiles)
+
+        # Stack stored and freshly transformed rows, then put them back in candidate order
+        matrix = sparse.vstack([
+            self.movie_vectors[[rows[position] for position in known]],
+            self.transform([profiles[position] for position in unknown])
+        ]).tocsr()
+        return matrix[np.argsort(known + unknown)]
+
+def get_model_dir(model_dir=None):
+    return model_dir or config.TFIDF_MODEL_DIR
+
+def load_catalog_profiles():
+    """ Get every stored profile text from movie_enhanced_profiles """
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+
+    try:
+        cursor.execute("""
+            SELECT movie_id, profile_text FROM movie_enhanced_profiles
+            WHERE profile_text IS NOT NULL AND profile_text != ''
+            ORDER BY movie_id
+        """)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        connection.close()
+
+def build_tfidf_model(model_dir=None, keep_versions=None):
+    """ Fit a TF-IDF model over the whole profile catalog and save it as a new version """
+    model_dir = get_model_dir(model_dir)
+    if keep_versions is None:
+        keep_versions = config.TFIDF_MODEL_KEEP_VERSIONS
+
+    rows = load_catalog_profiles()
+    if not rows:
+        print("No enhanced profiles found, TF-IDF model not built")
+        return None
+
+    movie_ids = np.array([row['movie_id'] for row in rows], dtype=np.int64)
+    vectorizer = new_vectorizer()
+    movie_vectors = vectorizer.fit_transform([row['profile_text'] for row in rows]).tocsr()
+
+    version = time.strftime("%Y%m%d%H%M%S")
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    # Vocabulary plus IDF weights are enough to rebuild the vectorizer without refitting
+    with open(os.path.join(version_dir, "vocabulary.json"), "w") as f:
+        json.dump({term: int(index) for term, index in vectorizer.vocabulary_.items()}, f)
+    np.save(os.path.join(version_dir, "idf.npy"), vectorizer.idf_)
+    np.save(os.path.join(version_dir, "movie_ids.npy"), movie_ids)
+
+    # Raw CSR arrays (uncompressed) so workers can memory-map them instead of each loading a copy
+    # (both index arrays share a dtype so scipy never has to copy one of them on load)
+    movie_vectors.sort_indices()
+    index_dtype = np.int32 if movie_vectors.nnz < np.iinfo(np.int32).max else np.int64
+    np.save(os.path.join(version_dir, "data.npy"), movie_vectors.data.astype(np.float32))
+    np.save(os.path.join(version_dir, "indices.npy"), movie_vectors.indices.astype(index_dtype))
+    np.save(os.path.join(version_dir, "indptr.npy"), movie_vectors.indptr.astype(index_dtype))
+
+    # Approximate nearest-neighbour index used to retrieve extra candidates
+    build_lsh_index(movie_vectors, version_dir, n_tables=config.LSH_TABLES, n_bits=config.LSH_BITS)
+
+    with open(os.path.join(version_dir, "meta.json"), "w") as f:
+        json.dump({
+            "version": version,
+            "params": TFIDF_PARAMS,
+            "movies": len(movie_ids),
+            "terms": len(vectorizer.vocabulary_),
+            "shape": list(movie_vectors.shape)
+        }, f)
+
+    # Switch the current version atomically so a worker never loads half a model
+    pointer_path = os.path.join(model_dir, CURRENT_VERSION_FILE)
+    with open(pointer_path + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer_path + ".tmp", pointer_path)
+
+    prune_tfidf_models(model_dir, keep_versions)
+    print(f"Built TF-IDF model {version}: {len(movie_ids)} movies, {len(vectorizer.vocabulary_)} terms")
+    return version
+
+def prune_tfidf_models(model_dir=None, keep_versions=3):
+    """ Remove all but the newest model versions """
+    model_dir = get_model_dir(model_dir)
+    versions = sorted(name for name in os.listdir(model_dir) if os.path.isdir(os.path.join(model_dir, name)))
+    for version in versions[:-keep_versions] if keep_versions else []:
+        shutil.rmtree(os.path.join(model_dir, version), ignore_errors=True)
+
+def load_movie_vectors(version_dir):
+    """ Memory-map a version's movie ids and CSR vector arrays read-only, shared by every worker on the host """
+    movie_ids = np.load(os.path.join(version_dir, "movie_ids.npy"), mmap_mode="r")
+
+    with open(os.path.join(version_dir, "meta.json")) as f:
+        shape = tuple(json.load(f)["shape"])
+
+    movie_vectors = sparse.csr_matrix((
+        np.load(os.path.join(version_dir, "data.npy"), mmap_mode="r"),
+        np.load(os.path.join(version_dir, "indices.npy"), mmap_mode="r"),
+        np.load(os.path.join(version_dir, "indptr.npy"), mmap_mode="r")
+    ), shape=shape, copy=False)
+    return movie_ids, movie_vectors
+
+def load_tfidf_model(model_dir=None):
+    """ Load the current TF-IDF model version, or None if none has been built """
+    model_dir = get_model_dir(model_dir)
+    pointer_path = os.path.join(model_dir, CURRENT_VERSION_FILE)
+    if not os.path.exists(pointer_path):
+        return None
+
+    try:
+        with open(pointer_path) as f:
+            version = f.read().strip()
+        version_dir = os.path.join(model_dir, version)
+
+        with open(os.path.join(version_dir, "vocabulary.json")) as f:
+            vocabulary = json.load(f)
+        vectorizer = new_vectorizer(vocabulary=vocabulary)
+        vectorizer.idf_ = np.load(os.path.join(version_dir, "idf.npy"))
+
+        movie_ids, movie_vectors = load_movie_vectors(version_dir)
+
+        print(f"Loaded TF-IDF model {version} with {len(movie_ids)} movies")
+        return TfidfModel(version, vectorizer, movie_ids, movie_vectors, load_lsh_index(version_dir))
+    except Exception as e:
+        print(f"Error loading TF-IDF model: {e}")
+        return None
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_tfidf_model():
+    """ Get this worker's TF-IDF model, loading it on first use """
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                _model = load_tfidf_model()
+                _model_loaded = True
+    return _model
+
+if __name__ == "__main__":
+    # Run from backend/ with: python -m utils.tfidf_model
+    build_tfidf_model()
@@ -0,0 +1,59 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import get_config
+
+config = get_config()
+
+class TMDBClient:
+    """ Shared TMDB client that reuses pooled keep-alive connections """
+
+    def __init__(self, api_key=None, base_url=None, pool_size=None, timeout=None, max_retries=None, backoff_factor=None):
+        self.api_key = api_key if api_key is not None else config.TMDB_API_KEY
+        self.base_url = (base_url or config.TMDB_BASE_URL).rstrip("/")
+        self.pool_size = pool_size or config.TMDB_POOL_SIZE
+        self.timeout = timeout or config.TMDB_TIMEOUT
+
+        if max_retries is None:
+            max_retries = config.TMDB_MAX_RETRIES
+        if backoff_factor is None:
+            backoff_factor = config.TMDB_BACKOFF_FACTOR
+
+        # Retry rate limits and server errors with exponential backoff (honours Retry-After)
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+            pool_block=True
+        )
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def build_url(self, path):
+        """ Turn a TMDB path (or a full TMDB URL) into a request URL """
+        if path.startswith("http://") or path.startswith("https://"):
+            if not path.startswith(self.base_url + "/"):
+                raise ValueError(f"Refusing to request non-TMDB URL: {path}")
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, params=None, timeout=None):
+        """ Send a GET request to TMDB and return the raw response """
+        query = {"api_key": self.api_key}
+        if params:
+            query.update({key: value for key, value in params.items() if value is not None})
+
+        return self.session.get(self.build_url(path), params=query, timeout=timeout or self.timeout)
+
+# Single client shared by every helper and route in this worker
+tmdb_client = TMDBClient()
@@ -0,0 +1,14 @@
+-- Local movie catalog used as a read-through store for TMDB movie metadata
+
+CREATE TABLE IF NOT EXISTS `movie_catalog` (
+  `movie_id` int NOT NULL,
+  `title` varchar(255) DEFAULT NULL,
+  `details` mediumtext,
+  `cast_members` text,
+  `crew_members` text,
+  `keywords` text,
+  `certification` varchar(20) DEFAULT NULL,
+  `last_fetched` datetime DEFAULT NULL,
+  PRIMARY KEY (`movie_id`),
+  KEY `idx_movie_catalog_last_fetched` (`last_fetched`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
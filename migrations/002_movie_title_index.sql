@@ -0,0 +1,10 @@
+-- Normalized title to TMDB id index used to resolve questionnaire favourites without searching TMDB
+
+CREATE TABLE IF NOT EXISTS `movie_title_index` (
+  `normalized_title` varchar(255) NOT NULL,
+  `title` varchar(255) DEFAULT NULL,
+  `movie_id` int NOT NULL,
+  `resolved_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`normalized_title`),
+  KEY `idx_movie_title_index_movie_id` (`movie_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
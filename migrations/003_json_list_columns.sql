@@ -0,0 +1,11 @@
+-- Store list columns as native JSON instead of Python list literals
+-- Convert existing rows first, from backend/: python -m utils.backfill_list_columns
+
+ALTER TABLE `questionnaire`
+  MODIFY `favourite_movies` json DEFAULT NULL,
+  MODIFY `genres` json DEFAULT NULL,
+  MODIFY `favourite_actors` json DEFAULT NULL;
+
+ALTER TABLE `user_recommendations`
+  MODIFY `genres` json DEFAULT NULL,
+  MODIFY `actors` json DEFAULT NULL;
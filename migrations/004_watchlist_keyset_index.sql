@@ -0,0 +1,4 @@
+-- Composite index for keyset pagination of a user's watchlist in (date_added, id) order
+
+ALTER TABLE `user_watchlist`
+  ADD KEY `idx_user_watchlist_user_date_id` (`user_id`, `date_added`, `id`);
@@ -1,5 +1,18 @@
 -- Suggestify Database Schema
 
+CREATE TABLE `movie_catalog` (
+  `movie_id` int NOT NULL,
+  `title` varchar(255) DEFAULT NULL,
+  `details` mediumtext,
+  `cast_members` text,
+  `crew_members` text,
+  `keywords` text,
+  `certification` varchar(20) DEFAULT NULL,
+  `last_fetched` datetime DEFAULT NULL,
+  PRIMARY KEY (`movie_id`),
+  KEY `idx_movie_catalog_last_fetched` (`last_fetched`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 CREATE TABLE `movie_enhanced_profiles` (
   `id` int NOT NULL AUTO_INCREMENT,
   `movie_id` int NOT NULL,
@@ -16,6 +29,15 @@ CREATE TABLE `movie_enhanced_profiles` (
   KEY `idx_movie_enhanced_profiles_movie_id` (`movie_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=11 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+CREATE TABLE `movie_title_index` (
+  `normalized_title` varchar(255) NOT NULL,
+  `title` varchar(255) DEFAULT NULL,
+  `movie_id` int NOT NULL,
+  `resolved_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`normalized_title`),
+  KEY `idx_movie_title_index_movie_id` (`movie_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 CREATE TABLE `overall_recommendation_feedback` (
   `id` int NOT NULL AUTO_INCREMENT,
   `user_id` int NOT NULL,
@@ -28,12 +50,12 @@ CREATE TABLE `overall_recommendation_feedback` (
 CREATE TABLE `questionnaire` (
   `id` int NOT NULL AUTO_INCREMENT,
   `user_id` int NOT NULL,
-  `favourite_movies` text,
-  `genres` text,
+  `favourite_movies` json DEFAULT NULL,
+  `genres` json DEFAULT NULL,
   `age` int DEFAULT NULL,
   `gender` varchar(20) DEFAULT NULL,
   `watch_frequency` varchar(50) DEFAULT NULL,
-  `favourite_actors` text,
+  `favourite_actors` json DEFAULT NULL,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `last_updated` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
@@ -82,8 +104,8 @@ CREATE TABLE `user_recommendations` (
   `poster_path` varchar(255) DEFAULT NULL,
   `overview` text,
   `recommendation_score` float DEFAULT NULL,
-  `genres` text,
-  `actors` text,
+  `genres` json DEFAULT NULL,
+  `actors` json DEFAULT NULL,
   `release_date` varchar(20) DEFAULT NULL,
   `vote_average` float DEFAULT NULL,
   PRIMARY KEY (`id`),
@@ -127,6 +149,7 @@ CREATE TABLE `user_watchlist` (
   `notes` text,
   PRIMARY KEY (`id`),
   UNIQUE KEY `unique_user_movie` (`user_id`,`movie_id`),
+  KEY `idx_user_watchlist_user_date_id` (`user_id`,`date_added`,`id`),
   CONSTRAINT `user_watchlist_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=114 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 